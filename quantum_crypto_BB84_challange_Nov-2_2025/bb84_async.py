@@ -0,0 +1,333 @@
+"""
+Asynchronous BB84 pipeline: Alice, Eve and Bob as concurrent asyncio tasks
+
+The protocol drivers of bb84_challenge run every step on the full lists, one after the other. Here the qubits
+travel in batches and every party is a task:
+
+    Alice --[quantum link]--> (Eve) --[quantum link]--> Bob
+      ^                                                  |
+      +------------------[public channel]----------------+
+
+- the quantum links are bounded queues of QubitBatch: when Bob (or Eve) falls behind, Alice waits before sending
+  more (backpressure), so memory stays bounded by queue_size batches
+- the classical exchanges are messages on a PublicChannel: Bob announces the bases of every batch, Alice answers
+  with the sifting mask; at the end Alice reveals a subset of her key and Bob answers with his verdict
+- the simulator calls (preparation, interception, measurement) run in an executor, so while Bob measures batch k
+  Alice already prepares batch k + 1 and the sifting of batch k - 1 is exchanged on the public channel. With the
+  aer backend Eve's and Bob's measurements take turns (_simulator_lock): bb84_challenge keeps its transpile cache
+  and simulator counters in unsynchronised module globals
+- quantum_latency and classical_latency delay every delivery, for capacity studies of slow links
+
+    result = run_pipeline(10**6, batch_size=1 << 14, eve_present=True, classical_latency=0.01)
+    print(result.eve_detected, result.error_rate, result.elapsed_s)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any
+
+import numpy as np
+
+import bb84_challenge as bb84
+import fast_channel
+from bit_source import GeneratorBitSource
+from bitvector import BitVector
+
+PARTIES = ("alice", "bob") # the ends of the public channel (Eve only reads its transcript)
+
+_simulator_lock = threading.Lock() # serialises the AerSimulator runs of the executor threads
+
+
+@dataclass
+class QubitBatch:
+    """
+    Qubits travelling on a quantum link
+    @param index: batch number
+    @param qubits: fast_channel.PackedQubits ("numpy") or list of QuantumCircuit ("aer")
+    @param length: number of qubits
+    """
+    index: int
+    qubits: Any
+    length: int
+
+
+@dataclass
+class Message:
+    """
+    Message of the public channel
+    @param sender: "alice" or "bob"
+    @param kind: "bases", "mask", "reveal" or "verdict"
+    @param payload: content of the message
+    """
+    sender: str
+    kind: str
+    payload: Any
+
+
+@dataclass
+class PipelineResult:
+    """
+    Outcome of run_pipeline
+    @param qubits: qubits sent by Alice
+    @param batches: number of batches
+    @param sifted_bits: length of the raw key
+    @param revealed_bits: raw key bits revealed for the eavesdropping check
+    @param revealed_errors: revealed bits where Bob differs from Alice
+    @param eve_detected: True if the error rate exceeded the threshold
+    @param alice_key: Alice's raw key without the revealed bits
+    @param bob_key: Bob's raw key without the revealed bits
+    @param messages: number of messages exchanged on the public channel
+    @param elapsed_s: wall-clock duration of the pipeline
+    @param busy_s: time every party spent in its simulator calls (their sum exceeds elapsed_s when stages overlap)
+    """
+    qubits: int
+    batches: int
+    sifted_bits: int
+    revealed_bits: int
+    revealed_errors: int
+    eve_detected: bool
+    alice_key: BitVector
+    bob_key: BitVector
+    messages: int
+    elapsed_s: float
+    busy_s: dict[str, float] = field(default_factory=dict)
+
+    @property
+    def error_rate(self) -> float:
+        return self.revealed_errors / self.revealed_bits if self.revealed_bits else 0.0
+
+
+# Channels:------------------------------------------------
+class Link:
+    """
+    FIFO link delivering every item latency seconds after it was sent
+    @param latency: delivery delay in seconds
+    @param maxsize: maximum number of items in flight (0: unbounded); a full link blocks the sender
+    """
+
+    def __init__(self, latency: float = 0.0, maxsize: int = 0):
+        self.latency = latency
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize)
+
+    async def put(self, item):
+        await self._queue.put((time.monotonic() + self.latency, item))
+
+    async def get(self):
+        deliver_at, item = await self._queue.get()
+        delay = deliver_at - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return item
+
+
+class PublicChannel:
+    """
+    Authenticated classical channel between Alice and Bob. Everything sent is kept in transcript (what Eve learns).
+    @param latency: delivery delay of every message in seconds
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.transcript: list[Message] = []
+        self._inboxes = {party: Link(latency) for party in PARTIES}
+
+    async def send(self, sender: str, kind: str, payload):
+        """Send a message to the other party (never blocks)"""
+        message = Message(sender, kind, payload)
+        self.transcript.append(message)
+        recipient, = (party for party in PARTIES if party != sender)
+        await self._inboxes[recipient].put(message)
+
+    async def receive(self, recipient: str, kind: str):
+        """
+        Wait for the next message of recipient
+        @param kind: expected kind (the protocol is strictly ordered, anything else is an error)
+        @return: the payload
+        """
+        message = await self._inboxes[recipient].get()
+        if message.kind != kind:
+            raise RuntimeError(f"{recipient} expected a {kind!r} message, got {message.kind!r}")
+        return message.payload
+
+
+# Parties:-------------------------------------------------
+def _prepare(bits: BitVector, bases: BitVector, backend: str):
+    if backend == "numpy":
+        return fast_channel.prepare(bits.packed, bases.packed, len(bits))
+    return bb84.alice_prepare_qubits(bits.to_str(), bases.to_str())
+
+
+def _measure(qubits, bases: BitVector, backend: str, rng: np.random.Generator) -> BitVector:
+    if backend == "numpy":
+        return BitVector(fast_channel.measure(qubits, bases.packed, rng), len(bases))
+    with _simulator_lock:
+        return BitVector.from_str(bb84.bob_measure_qubits(qubits, bases.to_str(), batch_size=len(bases),
+                                                          shots="adaptive"))
+
+
+def _intercept(qubits, bases: BitVector, backend: str, rng: np.random.Generator):
+    if backend == "numpy":
+        return fast_channel.intercept(qubits, bases.packed, rng)[0]
+    with _simulator_lock:
+        return bb84.eve_intercept_qubits(qubits, bases.to_str(), batch_size=len(bases), shots="adaptive")[0]
+
+
+class _Pipeline:
+    """State shared by the tasks of one run_pipeline call"""
+
+    def __init__(self, numqubits: int, batch_size: int, eve_present: bool, backend: str, reveal_fraction: float,
+                 threshold: float, queue_size: int, quantum_latency: float, classical_latency: float,
+                 executor: Executor, seed: int):
+        self.numqubits = numqubits
+        self.batch_size = batch_size
+        self.eve_present = eve_present
+        self.backend = backend
+        self.reveal_fraction = reveal_fraction
+        self.threshold = threshold
+        self.executor = executor
+        # one generator per party: each is only used by the executor calls of its own party, one at a time
+        self.alice_rng, self.eve_rng, self.bob_rng = (np.random.default_rng(s)
+                                                      for s in np.random.SeedSequence(seed).spawn(3))
+        self.alice_source, self.eve_source, self.bob_source = (GeneratorBitSource(rng) for rng in
+                                                               (self.alice_rng, self.eve_rng, self.bob_rng))
+        self.to_eve = Link(quantum_latency, queue_size) if eve_present else None
+        self.to_bob = Link(quantum_latency, queue_size)
+        self.public = PublicChannel(classical_latency)
+        self.busy_s = {"alice": 0.0, "eve": 0.0, "bob": 0.0}
+        self.batches = -(-numqubits // batch_size)
+        self.alice_batches: dict[int, tuple[BitVector, BitVector]] = {} # bits and bases not yet sifted
+        self.measured: asyncio.Queue = asyncio.Queue() # Bob's (index, results) waiting for Alice's mask
+        self.alice_raw: list[np.ndarray] = []
+        self.bob_raw: list[np.ndarray] = []
+
+    async def _offload(self, party: str, func, *args):
+        """Run a simulator call in the executor and account for its duration"""
+        start = time.perf_counter()
+        result = await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+        self.busy_s[party] += time.perf_counter() - start
+        return result
+
+    async def alice_send(self):
+        """Prepare and send the batches"""
+        link = self.to_eve if self.eve_present else self.to_bob
+        for index in range(self.batches):
+            length = min(self.batch_size, self.numqubits - index * self.batch_size)
+            bits, bases = self.alice_source.bits(length), self.alice_source.bits(length)
+            self.alice_batches[index] = (bits, bases)
+            qubits = await self._offload("alice", _prepare, bits, bases, self.backend)
+            await link.put(QubitBatch(index, qubits, length))
+        await link.put(None)
+
+    async def eve(self):
+        """Intercept-resend every batch"""
+        while (batch := await self.to_eve.get()) is not None:
+            bases = self.eve_source.bits(batch.length)
+            batch.qubits = await self._offload("eve", _intercept, batch.qubits, bases, self.backend, self.eve_rng)
+            await self.to_bob.put(batch)
+        await self.to_bob.put(None)
+
+    async def bob_measure(self):
+        """Measure every batch and announce its bases"""
+        while (batch := await self.to_bob.get()) is not None:
+            bases = self.bob_source.bits(batch.length)
+            results = await self._offload("bob", _measure, batch.qubits, bases, self.backend, self.bob_rng)
+            await self.public.send("bob", "bases", (batch.index, bases))
+            await self.measured.put((batch.index, results))
+        await self.measured.put(None)
+
+    async def alice_sift(self):
+        """Answer Bob's bases with the sifting mask of every batch"""
+        for _ in range(self.batches):
+            index, bob_bases = await self.public.receive("alice", "bases")
+            bits, bases = self.alice_batches.pop(index)
+            mask = bb84.sift_mask(bases, bob_bases)
+            await self.public.send("alice", "mask", (index, mask))
+            self.alice_raw.append(bits.compress(mask).unpack())
+
+    async def bob_sift(self):
+        """Keep the results of the matching bases"""
+        while (item := await self.measured.get()) is not None:
+            index, results = item
+            mask_index, mask = await self.public.receive("bob", "mask")
+            if mask_index != index:
+                raise RuntimeError(f"Bob received the mask of batch {mask_index} for batch {index}")
+            self.bob_raw.append(results.compress(mask).unpack())
+
+    async def alice_reveal(self) -> tuple[BitVector, np.ndarray]:
+        """Reveal a random subset of the raw key and wait for Bob's verdict"""
+        raw = BitVector.from_bits(np.concatenate(self.alice_raw) if self.alice_raw else np.empty(0, np.uint8))
+        indices = np.sort(self.alice_rng.choice(len(raw), size=int(len(raw) * self.reveal_fraction),
+                                                replace=False))
+        await self.public.send("alice", "reveal", (indices, raw.take(indices)))
+        await self.public.receive("alice", "verdict")
+        return raw, indices
+
+    async def bob_verdict(self) -> tuple[BitVector, int, bool]:
+        """Compare the revealed bits and announce whether Eve was detected"""
+        raw = BitVector.from_bits(np.concatenate(self.bob_raw) if self.bob_raw else np.empty(0, np.uint8))
+        indices, alice_subset = await self.public.receive("bob", "reveal")
+        errors = (raw.take(indices) ^ alice_subset).popcount()
+        eve_detected = len(indices) > 0 and errors / len(indices) > self.threshold
+        await self.public.send("bob", "verdict", eve_detected)
+        return raw, errors, eve_detected
+
+
+async def run_pipeline_async(numqubits: int, batch_size: int = 1 << 12, eve_present: bool = False,
+                             backend: str = "numpy", reveal_fraction: float = 0.2, threshold: float = 0.0,
+                             queue_size: int = 4, quantum_latency: float = 0.0, classical_latency: float = 0.0,
+                             executor: Executor | None = None, seed: int = 84) -> PipelineResult:
+    """
+    Run one BB84 session through the asynchronous pipeline (see the module docstring)
+    @param numqubits: qubits sent by Alice
+    @param batch_size: qubits per batch
+    @param eve_present: if True, Eve intercepts and resends every qubit
+    @param backend: "numpy" (default) or "aer" (see bb84_challenge.BACKENDS)
+    @param reveal_fraction: fraction of the raw key revealed for the eavesdropping check
+    @param threshold: maximum accepted error rate on the revealed bits
+    @param queue_size: batches in flight on each quantum link before the sender waits
+    @param quantum_latency: delay of every batch on a quantum link, in seconds
+    @param classical_latency: delay of every message on the public channel, in seconds
+    @param executor: executor of the simulator calls (default: a thread pool with one worker per party)
+    @param seed: root seed of the parties' random generators
+    @return: PipelineResult
+    """
+    if backend not in bb84.BACKENDS:
+        raise ValueError(f"Unknown backend {backend!r}, expected one of {bb84.BACKENDS}")
+    if batch_size < 1 or queue_size < 1:
+        raise ValueError("batch_size and queue_size must be >= 1")
+
+    own_executor = executor is None
+    executor = ThreadPoolExecutor(max_workers=3) if own_executor else executor
+    pipeline = _Pipeline(numqubits, batch_size, eve_present, backend, reveal_fraction, threshold, queue_size,
+                         quantum_latency, classical_latency, executor, seed)
+    start = time.perf_counter()
+    try:
+        tasks = [pipeline.alice_send(), pipeline.bob_measure(), pipeline.alice_sift(), pipeline.bob_sift()]
+        if eve_present:
+            tasks.append(pipeline.eve())
+        await asyncio.gather(*tasks)
+        (alice_raw, indices), (bob_raw, errors, eve_detected) = await asyncio.gather(pipeline.alice_reveal(),
+                                                                                     pipeline.bob_verdict())
+    finally:
+        if own_executor:
+            executor.shutdown()
+
+    return PipelineResult(qubits=numqubits, batches=pipeline.batches, sifted_bits=len(bob_raw),
+                          revealed_bits=len(indices), revealed_errors=errors, eve_detected=eve_detected,
+                          alice_key=alice_raw.delete(indices), bob_key=bob_raw.delete(indices),
+                          messages=len(pipeline.public.transcript), elapsed_s=time.perf_counter() - start,
+                          busy_s=pipeline.busy_s)
+
+
+def run_pipeline(numqubits: int, **options) -> PipelineResult:
+    """
+    Synchronous wrapper of run_pipeline_async (starts its own event loop)
+    @param numqubits: qubits sent by Alice
+    @param options: see run_pipeline_async
+    @return: PipelineResult
+    """
+    return asyncio.run(run_pipeline_async(numqubits, **options))
@@ -73,45 +73,346 @@ Si les bases sont différentes :
 """
 
 
+from __future__ import annotations
+
+import os
 import random
-from qiskit import QuantumCircuit
-from qiskit_aer import AerSimulator
-from qiskit import transpile
+import sys
+from collections import OrderedDict
+from typing import TYPE_CHECKING
 
 import encryption_algorithms as enc # contains the encryption and decryption algorithms
+import file_encryption # streaming encryption/decryption of files
+import fast_channel # pure NumPy channel backend (no QuantumCircuit)
+from bitvector import BitVector # bit-packed keys, bases and masks
+import bit_source # random bits for the bits and bases (numpy Generator, os.urandom or the legacy random module)
+# The optional subsystems are imported by the functions that use them, so that importing this module stays fast:
+# qubit_registers (alice_prepare_qubits(..., register_size=N)), reconciliation (Cascade, reconcile_keys),
+# privacy_amplification (Toeplitz hashing, amplify_key), instrumentation (stage timings and simulator counters)
+# outcome_cache (enable_outcome_cache) and noisy_channel (the noise= option of Bob's measurement).
+
+if TYPE_CHECKING: # qiskit and qiskit_aer take seconds to import: they are loaded when a circuit is first built or run
+    from qiskit import QuantumCircuit
+    from qiskit_aer import AerSimulator
+    from instrumentation import Instrumentation
+    from noisy_channel import ChannelNoise
+    from outcome_cache import OutcomeCache
+
+DATA_DIR = os.path.dirname(os.path.abspath(__file__)) # the encrypted message files are next to this script
+BACKENDS = ("aer", "numpy") # "aer": one QuantumCircuit per qubit on AerSimulator, "numpy": closed-form packed simulation
 
 random.seed(84) # do not change this seed, otherwise you will get a different key
+default_bit_source = bit_source.LegacyBitSource() # same strings as random.choices on the seeded random module
 
 # Helper function:---------------------------------------
-def run_circuit(circ: QuantumCircuit) -> dict:
+MAJORITY_SHOTS = 1001 # shots for a majority vote: 1001 unpair number so + or - state will have at least +1 diffrent counts (so the method most_frequent work fin)
+TRANSPILE_CACHE_SIZE = 256 # max number of transpiled circuits kept (BB84 only ever uses a handful of distinct ones)
+
+_simulator = None # process-wide ideal AerSimulator, created on first use (see get_simulator)
+_transpile_cache = OrderedDict() # circuit_key(circ) -> transpiled circuit, least recently used first
+transpile_cache_stats = {"hits": 0, "misses": 0}
+_outcome_cache = None # outcome_cache.OutcomeCache while enabled: run_circuits samples cached distributions
+
+
+def get_simulator(noise: ChannelNoise | None = None) -> AerSimulator:
+    """
+    Return the process-wide AerSimulator of a channel (created once, then reused by every run)
+    @param noise: noisy_channel.ChannelNoise of the channel (default: the ideal simulator). Each noise configuration
+                  has its own simulator, shared with noisy_channel (noisy_channel.shared_simulator)
+    @return: the AerSimulator instance
+    """
+    if noise is not None and not noise.is_ideal:
+        import noisy_channel
+
+        return noisy_channel.shared_simulator(noise, "automatic")
+    global _simulator
+    if _simulator is None:
+        from qiskit_aer import AerSimulator
+        _simulator = AerSimulator()
+    return _simulator
+
+
+def circuit_key(circ: QuantumCircuit) -> tuple:
+    """
+    Structural key of a circuit: two circuits with the same key have the same gates on the same (qu)bits
+    @param circ: QuantumCircuit
+    @return: hashable tuple (the circuit name is ignored)
+    """
+    return (circ.num_qubits, circ.num_clbits, tuple(
+        (inst.operation.name,
+         tuple(circ.find_bit(q).index for q in inst.qubits),
+         tuple(circ.find_bit(c).index for c in inst.clbits),
+         tuple(inst.operation.params))
+        for inst in circ.data))
+
+
+def transpile_cached(circs: list[QuantumCircuit]) -> list[QuantumCircuit]:
+    """
+    Transpile the circuits for the simulator, reusing the already transpiled circuits with the same structure.
+    The circuits missing from the cache are transpiled together in a single transpile() call, then the least
+    recently used entries are evicted beyond TRANSPILE_CACHE_SIZE.
+    @param circs: list of QuantumCircuit
+    @return: list of transpiled circuits, in the same order as circs
+    """
+    keys = [circuit_key(circ) for circ in circs]
+    found = {}
+    missing = {}
+    for key, circ in zip(keys, circs):
+        if key in found or key in missing:
+            transpile_cache_stats["hits"] += 1
+        elif key in _transpile_cache:
+            transpile_cache_stats["hits"] += 1
+            found[key] = _transpile_cache[key]
+            _transpile_cache.move_to_end(key)
+        else:
+            transpile_cache_stats["misses"] += 1
+            missing[key] = circ
+    if missing:
+        from qiskit import transpile
+        for key, transpiled in zip(missing, transpile(list(missing.values()), get_simulator())):
+            found[key] = _transpile_cache[key] = transpiled
+        while len(_transpile_cache) > TRANSPILE_CACHE_SIZE:
+            _transpile_cache.popitem(last=False) # evict the least recently used entry
+    return [found[key] for key in keys]
+
+
+def is_noisy(simulator: AerSimulator) -> bool:
+    """
+    Tell if the simulator has a (non ideal) noise model attached
+    @param simulator: AerSimulator
+    @return: True if a measured outcome may differ from the ideal one
+    """
+    noise_model = simulator.options.noise_model
+    return noise_model is not None and not noise_model.is_ideal()
+
+
+def resolve_shots(shots: int | str, noise: ChannelNoise | None = None) -> int:
+    """
+    Number of shots to use for a single-qubit BB84 measurement
+    @param shots: a number of shots, or "adaptive":
+                  - ideal simulator: 1 shot. When the bases match the outcome is deterministic, and when they differ
+                    any single sample is already a fair coin, so a majority vote over 1001 shots adds nothing.
+                  - noisy simulator: MAJORITY_SHOTS shots, so that the most frequent result still gives the right bit
+    @param noise: ChannelNoise of the simulator that runs the measurement (see get_simulator)
+    @return: the number of shots
+    """
+    if shots == "adaptive":
+        return MAJORITY_SHOTS if is_noisy(get_simulator(noise)) else 1
+    if not isinstance(shots, int) or shots < 1:
+        raise ValueError(f"shots must be a positive int or 'adaptive', got {shots!r}")
+    return shots
+
+
+def clear_transpile_cache():
+    """
+    Empty the transpiled circuits cache and reset its hit/miss counters
+    """
+    _transpile_cache.clear()
+    transpile_cache_stats["hits"] = 0
+    transpile_cache_stats["misses"] = 0
+
+
+def enable_outcome_cache(maxsize: int | None = None, warmup_shots: int | None = None, seed: int = 84) -> OutcomeCache:
+    """
+    Memoize the outcome distribution of every circuit structure: run_circuits computes the distribution of each
+    distinct circuit once (exactly for small circuits on the ideal simulator, otherwise with a warm-up job of
+    warmup_shots shots) and then samples its counts with the cache's generator, without simulator jobs.
+    Circuits wider than outcome_cache.EXACT_MAX_QUBITS (qubit_registers) are simulated as usual and not cached:
+    their structure depends on the bits and bases of the whole register and never repeats.
+    Replaces a cache already enabled. The entries are keyed by channel noise and circuit structure.
+    @param maxsize: maximum number of distributions kept (least recently used evicted first; default CACHE_SIZE)
+    @param warmup_shots: shots of the warm-up simulation of the circuits without an exact distribution
+                         (default WARMUP_SHOTS)
+    @param seed: seed of the sampling generator
+    @return: the OutcomeCache (hits, misses, len)
+    """
+    import outcome_cache
+
+    global _outcome_cache
+    _outcome_cache = outcome_cache.OutcomeCache(outcome_cache.CACHE_SIZE if maxsize is None else maxsize,
+                                                outcome_cache.WARMUP_SHOTS if warmup_shots is None else warmup_shots,
+                                                seed)
+    return _outcome_cache
+
+
+def disable_outcome_cache():
+    """
+    Go back to simulating every circuit
+    """
+    global _outcome_cache
+    _outcome_cache = None
+
+
+def run_circuit(circ: QuantumCircuit, shots: int | str = MAJORITY_SHOTS, noise: ChannelNoise | None = None) -> dict:
     """
     Run a quantum circuit on the AerSimulator and return the counts
     @param circ: QuantumCircuit to run
+    @param shots: number of shots, or "adaptive" (see resolve_shots)
+    @param noise: ChannelNoise of the simulator (see run_circuits)
     @return: dictionary of measurement results and their counts
     """
-    simulator = AerSimulator()
-    circ = transpile(circ, simulator)
-    result = simulator.run(circ, shots=1001).result() # 1001 shots to get the most frequent result, so 1001 unpair number so + or - state will have at least +1 diffrent counts (so the method most_frequent work fin)
-    return result.get_counts(circ)
+    return run_circuits([circ], shots, noise=noise)[0]
+
+
+def run_circuits(circs: list[QuantumCircuit], shots: int | str = MAJORITY_SHOTS, transpiled: bool = True,
+                 noise: ChannelNoise | None = None) -> list[dict]:
+    """
+    Run several independent quantum circuits as ONE AerSimulator job and return the counts of each
+    @param circs: list of QuantumCircuit to run
+    @param shots: number of shots per circuit, or "adaptive" (see resolve_shots)
+    @param transpiled: transpile the circuits first (transpile_cached). False for circuits made only of gates the
+                       simulator runs natively, e.g. the x / h / measure registers of qubit_registers, which are wider
+                       than the statevector target transpile() checks against
+    @param noise: noisy_channel.ChannelNoise: run on the simulator of this channel (get_simulator(noise)), whose
+                  errors act on the "id" (fiber) gates of the circuits. The circuits then run untranspiled, since
+                  transpile() would remove these gates (x / h / id / measure are native gates of the simulator)
+    @return: list of dictionaries of measurement results and their counts, in the same order as circs
+    """
+    shots = resolve_shots(shots, noise)
+    if noise is not None and noise.is_ideal:
+        noise = None
+    transpiled = transpiled and noise is None
+    if _outcome_cache is not None:
+        return _run_cached(circs, shots, transpiled, noise)
+    return _run_job(circs, shots, transpiled, noise)
+
 
+def _run_job(circs: list[QuantumCircuit], shots: int, transpiled: bool, noise: ChannelNoise | None) -> list[dict]:
+    """One simulator job (see run_circuits)"""
+    import instrumentation
 
-def generate_random_binary_string(length: int=100) -> str:
+    if transpiled:
+        circs = transpile_cached(circs)
+    result = get_simulator(noise).run(circs, shots=shots).result()
+    instrumentation.simulator_stats["jobs"] += 1
+    instrumentation.simulator_stats["shots"] += shots * len(circs)
+    return [result.get_counts(i) for i in range(len(circs))]
+
+
+def _exact_distribution(circ: QuantumCircuit, noise: ChannelNoise | None) -> dict | None:
+    """
+    Exact outcome probabilities of a small circuit on the ideal simulator (statevector, no shots), or None when they
+    cannot be computed that way: noisy simulator, more than outcome_cache.EXACT_MAX_QUBITS qubits, or measurements
+    other than a final measure_all
+    """
+    from qiskit.quantum_info import Statevector
+
+    import outcome_cache
+
+    if is_noisy(get_simulator(noise)) or circ.num_qubits > outcome_cache.EXACT_MAX_QUBITS \
+            or circ.num_clbits != circ.num_qubits:
+        return None
+    measured = [(circ.find_bit(inst.qubits[0]).index, circ.find_bit(inst.clbits[0]).index)
+                for inst in circ.data if inst.operation.name == "measure"]
+    if sorted(measured) != [(q, q) for q in range(circ.num_qubits)]:
+        return None
+    try:
+        return Statevector(circ.remove_final_measurements(inplace=False)).probabilities_dict()
+    except Exception: # measurements in the middle of the circuit
+        return None
+
+
+def _run_cached(circs: list[QuantumCircuit], shots: int, transpiled: bool, noise: ChannelNoise | None) -> list[dict]:
+    """
+    run_circuits with the outcome cache: the missing structures get their exact distribution when possible,
+    otherwise one warm-up job; the counts are then sampled from the cache. Wide missing circuits are simulated
+    with the requested shots and left out of the cache.
+    """
+    from qiskit.result import Counts
+
+    import outcome_cache
+
+    keys = [(noise, circuit_key(circ)) for circ in circs] # the same circuit has another distribution on another channel
+    counts = [None] * len(circs)
+    missing = {} # key -> index of its first circuit (the later circuits with the same key are hits)
+    for i, key in enumerate(keys):
+        if key not in missing:
+            counts[i] = _outcome_cache.sample(key, shots)
+            if counts[i] is None:
+                missing[key] = i
+    if missing:
+        fresh = {} # distributions computed in this call (kept here too: a small cache may evict them meanwhile)
+        simulate = {}
+        uncached = set()
+        for key, i in missing.items():
+            distribution = _exact_distribution(circs[i], noise)
+            if distribution is not None:
+                fresh[key] = distribution
+            elif circs[i].num_qubits > outcome_cache.EXACT_MAX_QUBITS:
+                uncached.add(key)
+            else:
+                simulate[key] = circs[i]
+        if simulate:
+            for key, warmup in zip(simulate, _run_job(list(simulate.values()), _outcome_cache.warmup_shots,
+                                                      transpiled, noise)):
+                fresh[key] = warmup
+        wide = [i for i, key in enumerate(keys) if key in uncached]
+        if wide:
+            for i, wide_counts in zip(wide, _run_job([circs[i] for i in wide], shots, transpiled, noise)):
+                counts[i] = wide_counts
+        for i, key in enumerate(keys):
+            if counts[i] is None: # the missed lookup itself is drawn without counting a hit
+                if key not in _outcome_cache:
+                    _outcome_cache.put(key, fresh[key])
+                counts[i] = _outcome_cache.draw(key, shots) if missing[key] == i \
+                    else _outcome_cache.sample(key, shots)
+    return [Counts(sampled) for sampled in counts]
+
+
+def run_batched(circs: list[QuantumCircuit], batch_size: int = 1, shots: int | str = MAJORITY_SHOTS,
+                transpiled: bool = True, noise: ChannelNoise | None = None) -> list[dict]:
+    """
+    Run the circuits in jobs of batch_size circuits and return the counts of each circuit
+    @param circs: list of QuantumCircuit to run
+    @param batch_size: number of circuits submitted per simulator job (1: one job per circuit)
+    @param shots: number of shots per circuit, or "adaptive" (see resolve_shots)
+    @param transpiled: transpile the circuits first (see run_circuits)
+    @param noise: ChannelNoise of the simulator (see run_circuits)
+    @return: list of dictionaries of measurement results and their counts, in the same order as circs
+    """
+    if batch_size < 1:
+        raise ValueError("batch_size must be >= 1")
+    shots = resolve_shots(shots, noise)
+    if batch_size == 1 and transpiled:
+        return [run_circuit(circ, shots, noise) for circ in circs] # teaching path: one job per qubit
+    counts = []
+    for start in range(0, len(circs), batch_size):
+        counts.extend(run_circuits(circs[start:start + batch_size], shots, transpiled, noise))
+    return counts
+
+
+def generate_random_binary_string(length: int=100, source: bit_source.BitSource | None = None) -> str:
     """
     Generate a random binary string of specified length
     @param length: The desired length of the binary string
+    @param source: BitSource to draw from (default: default_bit_source, i.e. ''.join(random.choices(['0', '1'], k=length)))
     @return: String of random bits ('0' and '1')
     """
-    return ''.join(random.choices(['0', '1'], k=length))
+    return (default_bit_source if source is None else source).string(length)
+
+
+def generate_random_bits(length: int = 100, source: bit_source.BitSource | None = None) -> BitVector:
+    """
+    Same as generate_random_binary_string, packed
+    @param length: number of bits
+    @param source: BitSource to draw from (default: default_bit_source)
+    @return: BitVector of random bits
+    """
+    return (default_bit_source if source is None else source).bits(length)
 
 # --------------------------------------------------------
 # part 1: BB84 protocol without eavesdropping (no Eve)
 
-def alice_prepare_qubits(alice_bits:str, alice_bases:str)->list[QuantumCircuit]:
+def alice_prepare_qubits(alice_bits:str, alice_bases:str, backend:str="aer", register_size:int|None=None)->list[QuantumCircuit]:
     """
     Alice prepares a list of qubits based on her bits and bases
     @param alice_bits: string of bits
     @param alice_bases: string of bases
+    @param backend: "aer" (default) or "numpy" (see BACKENDS)
+    @param register_size: with backend="aer", put register_size qubits in each circuit instead of one
     @return: list of QuantumCircuit objects, each representing a single qubit
+             (with backend="numpy": a fast_channel.PackedQubits, with register_size: a qubit_registers.QubitRegisters,
+             both accepted by Eve and Bob in place of the list)
 
     rule:
     - base choice 0: encode in standard basis |0> or |1>
@@ -120,30 +421,92 @@ def alice_prepare_qubits(alice_bits:str, alice_bases:str)->list[QuantumCircuit]:
     note: the length of alice_bits and alice_bases must be the same
     """
     
-    qubits = [None] * len(alice_bits)
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend {backend!r}, expected one of {BACKENDS}")
+    if backend == "numpy":
+        return fast_channel.prepare_qubits(alice_bits, alice_bases)
+    if register_size is not None:
+        import qubit_registers
 
+        return qubit_registers.prepare(alice_bits, alice_bases, register_size)
 
+    from qiskit import QuantumCircuit
 
-    
-    #TODO: implement the qubits preparation
+    qubits = [None] * len(alice_bits)
+
+    for i, (bit, base) in enumerate(zip(alice_bits, alice_bases)):
+        qc = QuantumCircuit(1)
+        if bit == '1':
+            qc.x(0)  # |0> -> |1>
+        if base == '1':
+            qc.h(0)  # |0> -> |+> and |1> -> |->
+        qubits[i] = qc
 
     return qubits
 
 
 
-def bob_measure_qubits(qubits_from_alice:list[QuantumCircuit], bob_bases:str)->str:
+def _is_registers(qubits) -> bool:
+    """True for a qubit_registers.QubitRegisters (the module is loaded once registers have been prepared)"""
+    registers = sys.modules.get("qubit_registers")
+    return registers is not None and isinstance(qubits, registers.QubitRegisters)
+
+
+def measure_in_basis(qubit: QuantumCircuit, base: str, channel: bool = False) -> QuantumCircuit:
+    """
+    Build the circuit that measures a single qubit in the given basis (the input circuit is not modified)
+    @param qubit: QuantumCircuit representing a single qubit
+    @param base: '0' for the standard basis, '1' for the diagonal basis
+    @param channel: add the fiber ("id") gate carrying the channel noise before the measurement (see noisy_channel)
+    @return: new QuantumCircuit ending with the measurement
+    """
+    qc = qubit.copy()
+    if channel:
+        qc.id(0) # the fiber between the sender and Bob
+    if base == '1':
+        qc.h(0)  # |+> -> |0> and |-> -> |1>
+    qc.measure_all()
+    return qc
+
+
+def bob_measure_qubits(qubits_from_alice:list[QuantumCircuit], bob_bases:str, batch_size:int=1, shots:int|str=MAJORITY_SHOTS,
+                       noise:ChannelNoise|None=None)->str:
     """
     Bob measures the qubits he received from Alice
     @param qubits: list of QuantumCircuit objects, each representing a single qubit
     @param bob_bases: string of bases
+    @param batch_size: number of qubits measured per simulator job (1: one job per qubit, as in the challenge;
+                       with qubit_registers.QubitRegisters: number of registers per job)
+    @param shots: shots per qubit, or "adaptive": 1 shot on an ideal simulator, majority vote on a noisy one
+    @param noise: noisy_channel.ChannelNoise of the channel to Bob (default: ideal channel). The depolarizing and
+                  bit-flip errors act on a fiber ("id") gate before Bob's rotation and the circuits run on the
+                  simulator of this noise (get_simulator(noise)). Loss drops qubits before sifting and is only
+                  simulated by noisy_channel.run_noisy_session
     @return: list of bits as bits string, each representing the measurement result of a qubit
     I know that single bit is string...
     note: the length of qubits and bob_bases must be the same
     """
     
+    noisy = noise is not None and not noise.is_ideal
+    if noise is not None and noise.loss:
+        raise ValueError("photon loss drops qubits before sifting: use noisy_channel.run_noisy_session")
+    if isinstance(qubits_from_alice, fast_channel.PackedQubits):
+        if noisy:
+            raise ValueError("the numpy backend has no noisy channel: use noisy_channel.run_noisy_session(backend='numpy')")
+        return fast_channel.measure_qubits(qubits_from_alice, bob_bases)
+    if _is_registers(qubits_from_alice):
+        import qubit_registers
+
+        circuits = qubit_registers.rotate_and_measure(qubits_from_alice, bob_bases, channel=noisy)
+        return ''.join(qubit_registers.marginal_bits(counts, qc.num_qubits)
+                       for qc, counts in zip(circuits, run_batched(circuits, batch_size, shots, transpiled=False,
+                                                                   noise=noise)))
+
     measurements = [None] * len(qubits_from_alice)
     
-    #TODO
+    circuits = [measure_in_basis(qubit, base, channel=noisy) for qubit, base in zip(qubits_from_alice, bob_bases)]
+    for i, counts in enumerate(run_batched(circuits, batch_size, shots, transpiled=not noisy, noise=noise)):
+        measurements[i] = counts.most_frequent()
         
     # hint
     # when the counts of the mesurement give 50% 0 and 50% 1: you can
@@ -165,11 +528,15 @@ def compare_bases(alice_bases:str, bob_bases:str) -> list[int]:
 
     return: list of 0s and 1s, where 0 means discard the qubit and 1 means keep the qubit
     """
-    bases_to_keep = [0] * len(alice_bases)
+    return sift_mask(BitVector.from_str(alice_bases), BitVector.from_str(bob_bases)).to_list()
 
-    #TODO
 
-    return bases_to_keep
+def sift_mask(alice_bases: BitVector, bob_bases: BitVector) -> BitVector:
+    """
+    Bit-packed version of compare_bases
+    @return: BitVector with 1 where the bases match (qubit kept) and 0 elsewhere
+    """
+    return ~(alice_bases ^ bob_bases)
 
 
 def extract_key_from_measurements(measured_key: str, keep_mask: list[int]) -> str:
@@ -181,29 +548,38 @@ def extract_key_from_measurements(measured_key: str, keep_mask: list[int]) -> st
                        (Renamed from bases_to_keep for clarity.)
     @return: The extracted key as a string.
     """
-    key = ''
-    
-    #TODO
-
-    return key
+    return BitVector.from_str(measured_key).compress(BitVector.from_bits(keep_mask)).to_str()
 
 # --------------------------------------------------------
 # part 2: Eavesdropping detection
 
-def eve_intercept_qubits(qubits: list[QuantumCircuit], eve_bases: str) -> tuple[list[QuantumCircuit], str]:
+def eve_intercept_qubits(qubits: list[QuantumCircuit], eve_bases: str, batch_size: int = 1,
+                         shots: int | str = MAJORITY_SHOTS) -> tuple[list[QuantumCircuit], str]:
     """
     Eve intercepts the qubits:
     - For each qubit, she uses her random chosen basis (eve_bases) to measure the qubit.
     - She then re-prepares a new qubit in the state corresponding to her measurement and basis.
     Returns a new list of QuantumCircuit objects for Bob. and a bit string of the measured bits from alice.
+    batch_size is the number of qubits measured per simulator job (1: one job per qubit),
+    shots the number of shots per qubit or "adaptive" (see bob_measure_qubits).
+    With the numpy backend (qubits is a fast_channel.PackedQubits) the new qubits are packed too, and with
+    qubit_registers.QubitRegisters Eve resends registers of the same size.
     """
     
-    measured_intercepted_qubits = [None] * len(qubits) # Eve measurement results of the qubits from alice.
-    intercepted_new_qubits = [None] * len(qubits) # New qubits prepared by Eve for Bob.
-    
-    #TODO
-    
-    return intercepted_new_qubits, ''.join(measured_intercepted_qubits)
+    if isinstance(qubits, fast_channel.PackedQubits):
+        return fast_channel.intercept_qubits(qubits, eve_bases)
+    if _is_registers(qubits):
+        import qubit_registers
+
+        measured = bob_measure_qubits(qubits, eve_bases, batch_size, shots)
+        return qubit_registers.prepare(measured, eve_bases, qubits.register_size), measured
+
+    # Eve measures exactly like Bob would (her results on the qubits from alice),
+    # then prepares new qubits for Bob exactly like Alice would.
+    measured_intercepted_qubits = bob_measure_qubits(qubits, eve_bases, batch_size, shots)
+    intercepted_new_qubits = alice_prepare_qubits(measured_intercepted_qubits, eve_bases)
+
+    return intercepted_new_qubits, measured_intercepted_qubits
 
 
 def reveal_key_subset(key: str, reveal_fraction: float = 0.2) -> tuple[str, list[int]]:
@@ -216,11 +592,8 @@ def reveal_key_subset(key: str, reveal_fraction: float = 0.2) -> tuple[str, list
              of those indices.
     """
     # Build the subset string based on the sampled indices (Random sampling without replacement)
-    
-    subset = None
-    sorted_indices = None
-
-    # TODO
+    sorted_indices = sorted(random.sample(range(len(key)), int(len(key) * reveal_fraction)))
+    subset = BitVector.from_str(key).take(sorted_indices).to_str()
     
     return subset, sorted_indices
 
@@ -233,9 +606,13 @@ def remove_revealed_key(full_key: str, revealed_indices: list[int]) -> str:
     @param revealed_indices: A list of indices of the bits that were revealed publicly.
     @return: The secret key with the revealed bits removed.
     """
-    # Convert the list to a set for more efficient membership testing
-    revealed_set = set(revealed_indices)
-    secret_key = ''.join(bit for i, bit in enumerate(full_key) if i not in revealed_set)
+    # indices outside the key are ignored (never counted from the end)
+    indices = [i for i in revealed_indices if 0 <= i < len(full_key)]
+    try:
+        secret_key = BitVector.from_str(full_key).delete(indices).to_str()
+    except ValueError: # not a '0'/'1' string: remove the characters one by one
+        revealed_set = set(indices)
+        secret_key = ''.join(bit for i, bit in enumerate(full_key) if i not in revealed_set)
     return secret_key
 
 
@@ -251,17 +628,60 @@ def bob_detect_eve(bob_raw_key: str, revealed_alice: tuple[str, list[int]], thre
     """
 
     alice_subset, indices = revealed_alice
-    
-    error_rate = None
-    # TODO: 
+    error_rate = error_rate_at(BitVector.from_str(bob_raw_key), BitVector.from_str(alice_subset), indices)
 
     # If error rate exceeds threshold, eavesdropping is suspected.
     return error_rate > threshold , error_rate
 
 
+def error_rate_at(bob_key: BitVector, alice_subset: BitVector, indices: list[int]) -> float:
+    """
+    Bit-packed core of bob_detect_eve: fraction of Bob's bits at indices that differ from Alice's revealed bits
+    @return: error rate (0.0 when nothing was revealed)
+    """
+    if not indices:
+        return 0.0
+    return (bob_key.take(indices) ^ alice_subset).popcount() / len(indices)
+
+
+def reconcile_keys(alice_key: str, bob_key: str, qber: float) -> tuple[str, int]:
+    """
+    Information reconciliation: correct Bob's key so that it matches Alice's (Cascade, see reconciliation.py)
+    @param alice_key: Alice's key (only parities of it are disclosed)
+    @param bob_key: Bob's key, same length
+    @param qber: estimated error rate between the two keys
+    @return: tuple (Bob's corrected key, number of bits leaked on the public channel)
+    """
+    import reconciliation
+
+    result = reconciliation.cascade(BitVector.from_str(alice_key), BitVector.from_str(bob_key), qber)
+    if not result.keys_match:
+        raise ValueError("Reconciliation failed: the keys still differ after Cascade")
+    return result.key.to_str(), result.leaked_bits
+
+
+def amplify_key(key: str, qber: float, leaked_bits: int, seed: int = 84) -> str:
+    """
+    Privacy amplification: compress the key so that Eve's partial knowledge of it is removed (see privacy_amplification.py)
+    @param key: reconciled key (the same for Alice and Bob)
+    @param qber: estimated error rate
+    @param leaked_bits: bits disclosed by the reconciliation
+    @param seed: public seed of the Toeplitz hash
+    @return: the final key (may be empty when the key is too short or too noisy)
+    """
+    import privacy_amplification
+
+    return privacy_amplification.amplify(BitVector.from_str(key), qber, leaked_bits, seed).to_str()
+
+
 # --------------------------------------------------------
 
-def bb84_protocol_no_eve()->str:
+def _printer(quiet: bool):
+    """print, or a function doing nothing in quiet mode"""
+    return (lambda *args, **kwargs: None) if quiet else print
+
+
+def bb84_protocol_no_eve(instrument: Instrumentation | None = None, quiet: bool = False)->str:
     """
     SIMPLIFIED BB84 protocol for pedagogical purposes (Part 1 of the challenge).
     
@@ -279,45 +699,56 @@ def bb84_protocol_no_eve()->str:
     Use this for learning the basics. For the COMPLETE protocol,
     use bb84_protocol_eve_is_here() which includes all security steps.
     
+    @param instrument: optional Instrumentation recording every stage (see instrumentation.py)
+    @param quiet: if True, nothing is printed
     @return: The raw key (before security verification)
     """
+    from instrumentation import stage
+
+    log = _printer(quiet)
     
     numqubits = 100 # the length of the bits string
 
     # step 1: Alice prepares the qubits, and send them to Bob
     #         also, it send the its bases to Bob
 
-    alice_bits:str = generate_random_binary_string(numqubits)  # k - bits to encode: out of which the key will later be formed
-    alice_bases:str = generate_random_binary_string(numqubits) # b - basis choices: determines the bases in which she will encode her bits.
+    with stage(instrument, "prepare"):
+        alice_bits:str = generate_random_binary_string(numqubits)  # k - bits to encode: out of which the key will later be formed
+        alice_bases:str = generate_random_binary_string(numqubits) # b - basis choices: determines the bases in which she will encode her bits.
     
-    qubits_from_alice:list[QuantumCircuit] = alice_prepare_qubits(alice_bits, alice_bases)
+        qubits_from_alice:list[QuantumCircuit] = alice_prepare_qubits(alice_bits, alice_bases)
     
     # -----------------------------------------------------------------
     # step 2: Bob measures the qubits
     #        also, he send the its bases to Alice
     
-    bob_bases:str = generate_random_binary_string(numqubits)  # b' - basis choices: determines the bases in which he will measure the qubits.
+    with stage(instrument, "measure"):
+        bob_bases:str = generate_random_binary_string(numqubits)  # b' - basis choices: determines the bases in which he will measure the qubits.
 
-    bob_mes_res:str = bob_measure_qubits(qubits_from_alice, bob_bases)
+        bob_mes_res:str = bob_measure_qubits(qubits_from_alice, bob_bases)
 
-    print("Alice's bases:", alice_bases)
-    print("Bob's bases: ", bob_bases)
+    log("Alice's bases:", alice_bases)
+    log("Bob's bases: ", bob_bases)
 
     # -----------------------------------------------------------------
     # step 3: Alice and Bob compare their bases
-    qubits_indices_to_keep:list[int] = compare_bases(alice_bases, bob_bases)
-    print("Indices to keep:", qubits_indices_to_keep)
-
-    # -----------------------------------------------------------------
     # step 4: Alice and Bob extract the key
-    key:str = extract_key_from_measurements(bob_mes_res, qubits_indices_to_keep)
-    print("Key:", key)
+    with stage(instrument, "sift"):
+        qubits_indices_to_keep:list[int] = compare_bases(alice_bases, bob_bases)
+        key:str = extract_key_from_measurements(bob_mes_res, qubits_indices_to_keep)
+    log("Indices to keep:", qubits_indices_to_keep)
+    log("Key:", key)
+
+    if instrument is not None:
+        instrument.count("qubits", numqubits)
+        instrument.count("sifted_key_length", len(key))
 
     return key
 
 # --------------------------------------------------------
 
-def bb84_protocol_eve_is_here(eve_present: bool = True) -> str:
+def bb84_protocol_eve_is_here(eve_present: bool = True, instrument: Instrumentation | None = None, quiet: bool = False,
+                              threshold: float = 0.0, amplify: bool = False, noise: ChannelNoise | None = None) -> str:
     """
     COMPLETE BB84 protocol implementation (Part 2 of the challenge).
     
@@ -331,62 +762,101 @@ def bb84_protocol_eve_is_here(eve_present: bool = True) -> str:
     
     @param eve_present: If True, simulates an eavesdropper (Eve) intercepting qubits
                         If False, direct transmission from Alice to Bob
+    @param instrument: optional Instrumentation recording every stage (see instrumentation.py)
+    @param quiet: if True, nothing is printed
+    @param threshold: maximum accepted error rate on the revealed bits. With threshold > 0 the remaining keys may
+                      differ in a few bits, they are corrected with Cascade (reconcile_keys) before being used.
+    @param amplify: if True, the key goes through privacy amplification (amplify_key) as the last step
+    @param noise: noisy_channel.ChannelNoise of the channel to Bob (default: ideal channel, see bob_measure_qubits)
     @return: The final secret key (after removing revealed bits for verification)
              Returns ~80% of the raw key (20% sacrificed for security check)
     """
+    from instrumentation import stage
+
+    log = _printer(quiet)
     numqubits = 100  # length of the bit strings
 
     # step 1) Alice's preparation:
-    alice_bits: str = generate_random_binary_string(numqubits)   # message bits (secret)
-    alice_bases: str = generate_random_binary_string(numqubits)  # basis choices for encoding
-    qubits_from_alice:list[QuantumCircuit] = alice_prepare_qubits(alice_bits, alice_bases)
+    with stage(instrument, "prepare"):
+        alice_bits: str = generate_random_binary_string(numqubits)   # message bits (secret)
+        alice_bases: str = generate_random_binary_string(numqubits)  # basis choices for encoding
+        qubits_from_alice:list[QuantumCircuit] = alice_prepare_qubits(alice_bits, alice_bases)
     
     # step 2) Eve's interception if active:
     if eve_present:
-        eve_bases: str = generate_random_binary_string(numqubits)
-        qubits_from_alice,_ = eve_intercept_qubits(qubits_from_alice, eve_bases) # Eve intercepts the qubits, we keep the same varaiable name just to remain consisitant with Bob when he recive the qubits (cause he don't really know where oit come s from)
+        with stage(instrument, "intercept"):
+            eve_bases: str = generate_random_binary_string(numqubits)
+            qubits_from_alice,_ = eve_intercept_qubits(qubits_from_alice, eve_bases) # Eve intercepts the qubits, we keep the same varaiable name just to remain consisitant with Bob when he recive the qubits (cause he don't really know where oit come s from)
 
     # step 3) Bob's measurement:
-    bob_bases: str = generate_random_binary_string(numqubits)  # Bob's bases for measurement
-    bob_mes_res: str = bob_measure_qubits(qubits_from_alice, bob_bases) # Bob thinks he measured Alice's qubits
+    with stage(instrument, "measure"):
+        bob_bases: str = generate_random_binary_string(numqubits)  # Bob's bases for measurement
+        bob_mes_res: str = bob_measure_qubits(qubits_from_alice, bob_bases, noise=noise) # Bob thinks he measured Alice's qubits
 
-    print("Alice's bases:", alice_bases)
-    print("Bob's bases:  ", bob_bases)
+    log("Alice's bases:", alice_bases)
+    log("Bob's bases:  ", bob_bases)
     
     # step 4) Basis comparison (Sifting Phase):
-    indices_mask:list[int] = compare_bases(alice_bases, bob_bases)
-    print("Indices to keep (mask):", indices_mask)
-    
+    with stage(instrument, "sift"):
+        indices_mask:list[int] = compare_bases(alice_bases, bob_bases)
     
-    bob_raw_key:str = extract_key_from_measurements(bob_mes_res, indices_mask)
-    alice_raw_key:str = extract_key_from_measurements(alice_bits, indices_mask)
+        bob_raw_key:str = extract_key_from_measurements(bob_mes_res, indices_mask)
+        alice_raw_key:str = extract_key_from_measurements(alice_bits, indices_mask)
+    log("Indices to keep (mask):", indices_mask)
 
-    print("Bob's raw key:  ", bob_raw_key)
-    print("Alice's raw key:", alice_raw_key)
+    log("Bob's raw key:  ", bob_raw_key)
+    log("Alice's raw key:", alice_raw_key)
     # debug: the key must be the same for both Alice and Bob
     #assert bob_raw_key == alice_raw_key, "The keys are not the same for Alice and Bob!"
 
     # step 5) 
     # Alice and Bob reveal a subset of their keys to detect eavesdropping.
     # since we are working from bob side, we will reveal a subset of Alice's key.
-    alice_revealed_subset_indices = reveal_key_subset(alice_raw_key, reveal_fraction=0.2) # 20% reveal rate
+    with stage(instrument, "reveal"):
+        alice_revealed_subset_indices = reveal_key_subset(alice_raw_key, reveal_fraction=0.2) # 20% reveal rate
     
-    # step 6) Eavesdropping detection (using a 20% reveal rate, threshold error rate 0% scinarion)
-    eve_detected, error_rate = bob_detect_eve(bob_raw_key, alice_revealed_subset_indices, threshold=0.0) # 0% error rate threshold: simplest case => detect or not eve. if we use acceptation error rate is > 0, this mean alice and bob will not have exactly the same key (they accept some error rate in the key), so there is another step for that scinario.
+    # step 6) Eavesdropping detection (using a 20% reveal rate, threshold error rate 0% scinarion by default)
+    with stage(instrument, "detect"):
+        eve_detected, error_rate = bob_detect_eve(bob_raw_key, alice_revealed_subset_indices, threshold=threshold) # 0% error rate threshold: simplest case => detect or not eve. if we use acceptation error rate is > 0, this mean alice and bob will not have exactly the same key (they accept some error rate in the key), so there is another step for that scinario: the reconciliation (step 8).
+
+    if instrument is not None:
+        instrument.count("qubits", numqubits)
+        instrument.count("sifted_key_length", len(bob_raw_key))
+        instrument.count("revealed_bits", len(alice_revealed_subset_indices[1]))
+        instrument.count("error_rate", error_rate)
+        instrument.count("eve_detected", eve_detected)
     
     if eve_detected:
-        print("Eavesdropping detected! (Eve intercepted the qubits)")
-        print(" We will not proceed with the final key....")
+        log("Eavesdropping detected! (Eve intercepted the qubits)")
+        log(" We will not proceed with the final key....")
         raise ValueError("Eavesdropping detected! (Eve intercepted the qubits)")
         return None
     
    # If no eavesdropping detected, proceed with the final key.
-    print("No eavesdropping detected.")
+    log("No eavesdropping detected.")
     
     # For final key, remove or discard the revealed bits.
-    secrect_key:str = remove_revealed_key(bob_raw_key, alice_revealed_subset_indices[1])
+    with stage(instrument, "distill"):
+        secrect_key:str = remove_revealed_key(bob_raw_key, alice_revealed_subset_indices[1])
+
+    # step 8) Information reconciliation: accepted errors are corrected with Cascade
+    leaked_bits = 0
+    if threshold > 0:
+        with stage(instrument, "reconcile"):
+            alice_key:str = remove_revealed_key(alice_raw_key, alice_revealed_subset_indices[1])
+            secrect_key, leaked_bits = reconcile_keys(alice_key, secrect_key, error_rate)
+        log("Reconciliation leaked", leaked_bits, "bits")
+
+    # step 9) Privacy amplification: remove what Eve may know about the key
+    if amplify:
+        with stage(instrument, "amplify"):
+            secrect_key = amplify_key(secrect_key, error_rate, leaked_bits)
+
+    if instrument is not None:
+        instrument.count("leaked_bits", leaked_bits)
+        instrument.count("final_key_length", len(secrect_key))
    
-    print("Final key:", secrect_key)
+    log("Final key:", secrect_key)
     return secrect_key
 
 # --------------------------------------------------------
@@ -404,12 +874,8 @@ def decrypt_and_print_messages(key: str, filename: str = "encrypted_messages.txt
         filename (str): The file to read encrypted messages from.
     """
     print("\nDecrypting all messages from", filename)
-    with open(filename, "r") as f:
-        for line in f:
-            if ": " in line:
-                msg_id, encrypted = line.split(": ", 1)
-                decrypted = enc.decrypt_xor_repeating_key(encrypted.strip(), key)
-                print(f"{msg_id}: {decrypted}")
+    for msg_id, decrypted in file_encryption.iter_decrypted_messages(filename, key):
+        print(f"{msg_id}: {decrypted}")
 
 # =========================================================
 
@@ -445,11 +911,11 @@ def main():
     # Decrypt multiple messages from file
     # using the generated key part 1:
     print("\nDecrypting multiple messages from file -> Part 1")
-    decrypt_and_print_messages(key, filename="Shacks UdeS/quantum_crypto_BB84_challange/encrypted_messages_part1.txt")
+    decrypt_and_print_messages(key, filename=os.path.join(DATA_DIR, "encrypted_messages_part1.txt"))
 
     # using the generated key part 2:
     print("\nDecrypting multiple messages from file -> Part 2")
-    decrypt_and_print_messages(key, filename="Shacks UdeS/quantum_crypto_BB84_challange/encrypted_messages_part2.txt")
+    decrypt_and_print_messages(key, filename=os.path.join(DATA_DIR, "encrypted_messages_part2.txt"))
 
 
 if __name__ == "__main__":
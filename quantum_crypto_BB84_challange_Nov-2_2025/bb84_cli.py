@@ -0,0 +1,128 @@
+"""
+Command-line runner for BB84 key generation
+
+main() of bb84_challenge is the tutorial: 100 qubits, no Eve, settings in the source. This runner exposes the
+session parameters and writes the key and the statistics to files, so batch runs can be scripted and profiled:
+
+    python bb84_cli.py --qubits 1000000 --block-size 65536 --workers 4 --output key.json
+    python bb84_cli.py --qubits 1000000 --eve --threshold 0.11 --format binary --output key.bin --stats stats.json
+    python bb84_cli.py --qubits 2000 --backend aer --seed 7
+
+The session is cut into blocks of --block-size qubits (parallel_sessions.run_blocks). Block i always uses the i-th
+stream spawned from --seed, so the key does not depend on --workers (bit for bit with the numpy backend).
+
+Output:
+- --format json (default): one JSON document {"config", "stats", "blocks", "key_bits", "key"} (key in hex)
+- --format binary: the raw key bytes (packed bits, the last byte padded with zeros); the statistics go to --stats
+  (JSON) or to stdout
+Without --output, the statistics are printed to stdout and the key is not written.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from dataclasses import asdict
+
+import numpy as np
+
+import bb84_challenge as bb84
+import key_stream
+import parallel_sessions
+from bitvector import BitVector
+
+FORMATS = ("json", "binary")
+
+
+def generate(qubits: int, block_size: int, seed: int = 84, workers: int | None = 1,
+             **block_options) -> tuple[BitVector, key_stream.SessionStats, list[key_stream.KeyBlock]]:
+    """
+    Run a session of qubits qubits, block by block, over a process pool
+    @param qubits: total number of qubits sent by Alice
+    @param block_size: qubits per block (the last block may be shorter)
+    @param seed: root seed of the block streams
+    @param workers: worker processes (see parallel_sessions.parallel_map)
+    @param block_options: eve_present, backend, reveal_fraction, threshold, amplify (see key_stream.run_block)
+    @return: tuple (Bob's key, concatenation of the accepted blocks; SessionStats; KeyBlocks without their keys)
+    """
+    if qubits < 1 or block_size < 1:
+        raise ValueError("qubits and block_size must be >= 1")
+    sizes = [min(block_size, qubits - start) for start in range(0, qubits, block_size)]
+    blocks = parallel_sessions.run_blocks(sizes, seed, workers=workers, **block_options)
+    stats = key_stream.SessionStats()
+    keys = []
+    for block in blocks:
+        stats.add(block)
+        if block.secret_key is not None:
+            keys.append(block.secret_key.unpack())
+            block.secret_key = None
+    key = BitVector.from_bits(np.concatenate(keys)) if keys else BitVector.zeros(0)
+    return key, stats, blocks
+
+
+def statistics(stats: key_stream.SessionStats, elapsed_s: float) -> dict:
+    """
+    @return: the session statistics as a JSON-serializable dict
+    """
+    return {**asdict(stats), "qber": stats.qber, "secret_rate": stats.secret_rate, "elapsed_s": elapsed_s,
+            "qubits_per_s": stats.qubits / elapsed_s if elapsed_s > 0 else None}
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Generate a BB84 key and its statistics")
+    parser.add_argument("--qubits", type=int, default=100, help="total number of qubits sent by Alice")
+    parser.add_argument("--block-size", type=int, default=1 << 16, help="qubits per block")
+    parser.add_argument("--backend", choices=bb84.BACKENDS, default="numpy", help="channel simulation")
+    parser.add_argument("--eve", action="store_true", help="Eve intercepts and resends every qubit")
+    parser.add_argument("--threshold", type=float, default=0.0,
+                        help="maximum accepted error rate (> 0: accepted blocks are reconciled with Cascade)")
+    parser.add_argument("--reveal-fraction", type=float, default=0.2, help="fraction of the raw key revealed")
+    parser.add_argument("--amplify", action="store_true", help="apply privacy amplification to every block")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes (0: one per CPU)")
+    parser.add_argument("--seed", type=int, default=84, help="root seed of the session")
+    parser.add_argument("--format", choices=FORMATS, default="json", help="format of --output")
+    parser.add_argument("--output", help="file receiving the key (and the statistics in json format)")
+    parser.add_argument("--stats", help="file receiving the statistics as JSON (default: stdout)")
+    args = parser.parse_args(argv)
+    if args.format == "binary" and not args.output:
+        parser.error("--format binary needs --output")
+    if not 0.0 <= args.reveal_fraction <= 1.0:
+        parser.error("--reveal-fraction must be between 0 and 1")
+    return args
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    config = {"qubits": args.qubits, "block_size": args.block_size, "backend": args.backend, "eve": args.eve,
+              "threshold": args.threshold, "reveal_fraction": args.reveal_fraction, "amplify": args.amplify,
+              "seed": args.seed}
+
+    start = time.perf_counter()
+    key, stats, blocks = generate(args.qubits, args.block_size, seed=args.seed, workers=args.workers or None,
+                                  eve_present=args.eve, backend=args.backend, reveal_fraction=args.reveal_fraction,
+                                  threshold=args.threshold, amplify=args.amplify)
+    report = {"config": config, "stats": statistics(stats, time.perf_counter() - start),
+              "blocks": [{"index": block.index, "qubits": block.qubits, "sifted_bits": block.sifted_bits,
+                          "error_rate": block.error_rate, "eve_detected": block.eve_detected,
+                          "leaked_bits": block.leaked_bits} for block in blocks]}
+
+    if args.output and args.format == "json":
+        with open(args.output, "w") as f:
+            json.dump({**report, "key_bits": len(key), "key": key.to_bytes().hex()}, f, indent=2)
+    elif args.output:
+        with open(args.output, "wb") as f:
+            f.write(key.to_bytes())
+
+    if args.stats:
+        with open(args.stats, "w") as f:
+            json.dump(report, f, indent=2)
+    elif not (args.output and args.format == "json"):
+        json.dump(report["stats"], sys.stdout, indent=2)
+        print()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,271 @@
+"""
+Benchmark suite for the BB84 stages and the cipher functions (runs offline)
+
+Times every protocol stage (bit generation for every bit_source, alice_prepare_qubits, eve_intercept_qubits,
+bob_measure_qubits, compare_bases, extract_key_from_measurements, reveal_key_subset, bob_detect_eve,
+remove_revealed_key) for every channel backend over a sweep of qubit counts, and every cipher of
+encryption_algorithms over a sweep of payload sizes. Each benchmark records the best and median wall time over
+--repeat runs and the peak memory allocated (tracemalloc, measured in a separate run so that it does not slow down
+the timings). The import benchmarks time the cold start of the modules in fresh interpreters: the classical paths
+never load qiskit.
+
+usage:
+    python benchmarks.py --output bench.json                    # full sweep, 10^2 .. 10^6 qubits
+    python benchmarks.py --quick                                # small sweep, a few seconds
+    python benchmarks.py --only imports                         # cold-start time of the modules
+    python benchmarks.py --output new.json --compare bench.json # exit code 1 on regression
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable
+
+QUBIT_COUNTS = [10**2, 10**3, 10**4, 10**5, 10**6]
+PAYLOAD_SIZES = [10**3, 10**5, 10**7] # bytes / characters
+AER_MAX_QUBITS = 10**4 # the Aer backend builds one circuit per qubit: above this it is skipped
+TOLERANCE = 0.25 # relative slow-down reported as a regression by --compare
+IMPORT_TARGETS = { # name -> statement timed in a fresh interpreter
+    "encryption_algorithms": "import encryption_algorithms",
+    "bb84_challenge": "import bb84_challenge",
+    "key_stream": "import key_stream",
+    "bb84_challenge+aer": "import bb84_challenge; bb84_challenge.get_simulator()",
+}
+
+
+def measure(func: Callable[[], object], repeat: int) -> dict:
+    """
+    Time func and measure its peak memory
+    @param func: function without arguments
+    @param repeat: number of timed runs
+    @return: dict with best_s, median_s, peak_bytes
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {"best_s": min(timings), "median_s": statistics.median(timings), "peak_bytes": peak}
+
+
+def _record(results: list[dict], name: str, params: dict, func: Callable[[], object], repeat: int):
+    label = ",".join(f"{k}={v}" for k, v in params.items())
+    entry = {"name": f"{name}[{label}]", "benchmark": name, "params": params, **measure(func, repeat)}
+    results.append(entry)
+    print(f"{entry['name']:<70} best {entry['best_s'] * 1e3:10.3f} ms   peak {entry['peak_bytes'] / 1024:10.1f} KiB",
+          flush=True)
+
+
+# Protocol stages:-----------------------------------------
+def protocol_benchmarks(qubit_counts: list[int], backends: list[str], aer_max: int, repeat: int) -> list[dict]:
+    """
+    Benchmark every BB84 stage
+    @return: list of benchmark entries
+    """
+    import bb84_challenge as bb84
+    import bit_source
+
+    results = []
+    for backend in backends:
+        for n in qubit_counts:
+            if backend == "aer" and n > aer_max:
+                continue
+            params = {"backend": backend, "qubits": n}
+            random.seed(84)
+            alice_bits = bb84.generate_random_binary_string(n)
+            alice_bases = bb84.generate_random_binary_string(n)
+            eve_bases = bb84.generate_random_binary_string(n)
+            bob_bases = bb84.generate_random_binary_string(n)
+            channel = {"batch_size": n, "shots": "adaptive"} if backend == "aer" else {}
+
+            _record(results, "generate_random_binary_string", params,
+                    lambda: bb84.generate_random_binary_string(n), repeat)
+            _record(results, "alice_prepare_qubits", params,
+                    lambda: bb84.alice_prepare_qubits(alice_bits, alice_bases, backend=backend), repeat)
+            qubits = bb84.alice_prepare_qubits(alice_bits, alice_bases, backend=backend)
+            _record(results, "eve_intercept_qubits", params,
+                    lambda: bb84.eve_intercept_qubits(qubits, eve_bases, **channel), repeat)
+            _record(results, "bob_measure_qubits", params,
+                    lambda: bb84.bob_measure_qubits(qubits, bob_bases, **channel), repeat)
+            bob_results = bb84.bob_measure_qubits(qubits, bob_bases, **channel)
+
+            if backend != backends[0]:
+                continue # the classical stages do not depend on the backend
+            params = {"qubits": n}
+            for kind in bit_source.SOURCES:
+                source = bit_source.bit_source(kind, seed=84)
+                _record(results, "bit_source", {**params, "source": kind}, lambda: source.bits(n), repeat)
+            _record(results, "compare_bases", params, lambda: bb84.compare_bases(alice_bases, bob_bases), repeat)
+            mask = bb84.compare_bases(alice_bases, bob_bases)
+            _record(results, "extract_key_from_measurements", params,
+                    lambda: bb84.extract_key_from_measurements(bob_results, mask), repeat)
+            alice_raw_key = bb84.extract_key_from_measurements(alice_bits, mask)
+            bob_raw_key = bb84.extract_key_from_measurements(bob_results, mask)
+            _record(results, "reveal_key_subset", params, lambda: bb84.reveal_key_subset(alice_raw_key), repeat)
+            revealed = bb84.reveal_key_subset(alice_raw_key)
+            _record(results, "bob_detect_eve", params, lambda: bb84.bob_detect_eve(bob_raw_key, revealed), repeat)
+            _record(results, "remove_revealed_key", params,
+                    lambda: bb84.remove_revealed_key(bob_raw_key, revealed[1]), repeat)
+
+    if "aer" in backends:
+        circuit = bb84.measure_in_basis(bb84.alice_prepare_qubits("1", "1")[0], "1")
+        _record(results, "run_circuit", {"shots": bb84.MAJORITY_SHOTS}, lambda: bb84.run_circuit(circuit), repeat)
+    return results
+
+
+# Ciphers:-------------------------------------------------
+def cipher_benchmarks(payload_sizes: list[int], repeat: int) -> list[dict]:
+    """
+    Benchmark every cipher of encryption_algorithms and the streaming file encryption
+    @return: list of benchmark entries
+    """
+    import encryption_algorithms as enc
+    import file_encryption
+
+    results = []
+    key = "0110100111010110" # a short BB84-like key, as used by main()
+    for size in payload_sizes:
+        params = {"size": size}
+        text = (enc.message_test1 * (size // len(enc.message_test1) + 1))[:size]
+        data = os.urandom(size)
+        encrypted_hex = enc.encrypt_xor_repeating_key(text, key)
+
+        _record(results, "encrypt_xor_repeating_key", params, lambda: enc.encrypt_xor_repeating_key(text, key), repeat)
+        _record(results, "decrypt_xor_repeating_key", params,
+                lambda: enc.decrypt_xor_repeating_key(encrypted_hex, key), repeat)
+        _record(results, "xor_repeating_key_bytes", params, lambda: enc.xor_repeating_key_bytes(data, key), repeat)
+        _record(results, "encrypt_caesar_cipher", params, lambda: enc.encrypt_caesar_cipher(text, key), repeat)
+        _record(results, "encrypt_vigenere_cipher", params, lambda: enc.encrypt_vigenere_cipher(text, key), repeat)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            src, dst = os.path.join(tmp, "plain.bin"), os.path.join(tmp, "encrypted.bin")
+            with open(src, "wb") as f:
+                f.write(data)
+            _record(results, "encrypt_file", params, lambda: file_encryption.encrypt_file(src, dst, key), repeat)
+    return results
+
+
+# Imports:-------------------------------------------------
+def import_benchmarks(repeat: int) -> list[dict]:
+    """
+    Benchmark the cold-start time of IMPORT_TARGETS, each run in a new interpreter (no module cache)
+    @return: list of benchmark entries (peak_bytes is the peak resident memory of the interpreter, None off POSIX)
+    """
+    child = ("import sys, time\n"
+             "start = time.perf_counter()\n"
+             "exec(sys.argv[1])\n"
+             "elapsed = time.perf_counter() - start\n"
+             "try:\n"
+             "    import resource\n"
+             "    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024\n"
+             "except ImportError:\n"
+             "    peak = None\n"
+             "print(elapsed, peak, 'qiskit' in sys.modules)\n")
+    here = os.path.dirname(os.path.abspath(__file__))
+    results = []
+    for name, statement in IMPORT_TARGETS.items():
+        timings, peak, qiskit_loaded = [], None, False
+        for _ in range(repeat):
+            output = subprocess.run([sys.executable, "-c", child, statement], cwd=here, capture_output=True,
+                                    text=True, check=True).stdout.split()
+            timings.append(float(output[0]))
+            peak = None if output[1] == "None" else int(output[1])
+            qiskit_loaded = output[2] == "True"
+        entry = {"name": f"import[{name}]", "benchmark": "import", "params": {"module": name},
+                 "best_s": min(timings), "median_s": statistics.median(timings), "peak_bytes": peak,
+                 "qiskit_loaded": qiskit_loaded}
+        results.append(entry)
+        print(f"{entry['name']:<70} best {entry['best_s'] * 1e3:10.3f} ms   qiskit loaded: {qiskit_loaded}", flush=True)
+    return results
+
+
+# Baseline comparison:-------------------------------------
+def compare(results: list[dict], baseline: list[dict], tolerance: float = TOLERANCE) -> list[str]:
+    """
+    Compare results against a saved baseline (benchmarks are matched by name, on the best time)
+    @param results: new benchmark entries
+    @param baseline: benchmark entries of the baseline file
+    @param tolerance: relative slow-down accepted before reporting a regression
+    @return: list of regression messages (empty when nothing regressed)
+    """
+    reference = {entry["name"]: entry for entry in baseline}
+    regressions = []
+    for entry in results:
+        old = reference.get(entry["name"])
+        if old is None or old["best_s"] <= 0:
+            continue
+        ratio = entry["best_s"] / old["best_s"]
+        if ratio > 1 + tolerance:
+            regressions.append(f"{entry['name']}: {old['best_s'] * 1e3:.3f} ms -> {entry['best_s'] * 1e3:.3f} ms "
+                               f"(x{ratio:.2f})")
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the BB84 stages and the cipher functions")
+    parser.add_argument("--qubits", type=int, nargs="+", default=QUBIT_COUNTS, help="qubit counts to sweep")
+    parser.add_argument("--sizes", type=int, nargs="+", default=PAYLOAD_SIZES, help="payload sizes to sweep")
+    parser.add_argument("--backends", nargs="+", default=["numpy", "aer"], help="channel backends to benchmark")
+    parser.add_argument("--aer-max", type=int, default=AER_MAX_QUBITS, help="largest qubit count run on Aer")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per benchmark")
+    parser.add_argument("--only", choices=["protocol", "ciphers", "imports"], help="run only one group of benchmarks")
+    parser.add_argument("--quick", action="store_true", help="small sweep (10^2..10^4 qubits, 10^3..10^5 bytes)")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", metavar="BASELINE", help="JSON file of a previous run to compare against")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE, help="accepted relative slow-down")
+    args = parser.parse_args(argv)
+
+    if args.quick:
+        args.qubits = [n for n in args.qubits if n <= 10**4]
+        args.sizes = [n for n in args.sizes if n <= 10**5]
+        args.aer_max = min(args.aer_max, 10**3)
+
+    results = []
+    if args.only in (None, "protocol"):
+        results += protocol_benchmarks(args.qubits, args.backends, args.aer_max, args.repeat)
+    if args.only in (None, "ciphers"):
+        results += cipher_benchmarks(args.sizes, args.repeat)
+    if args.only in (None, "imports"):
+        results += import_benchmarks(args.repeat)
+
+    report = {
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nresults written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f)["results"], args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) against {args.compare}:")
+            for line in regressions:
+                print("  " + line)
+            return 1
+        print(f"\nno regression against {args.compare}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
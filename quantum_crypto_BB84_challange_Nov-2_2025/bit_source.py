@@ -0,0 +1,110 @@
+"""
+Sources of random bits for the BB84 bits and bases
+
+generate_random_binary_string draws one character at a time with random.choices, 3-4 times per protocol run.
+A BitSource returns the bits directly as a packed BitVector:
+
+- GeneratorBitSource: packed random bytes of a seeded numpy.random.Generator (fast, reproducible, simulations)
+- SystemBitSource: os.urandom (the operating system CSPRNG, for keys that are actually used)
+- LegacyBitSource: the exact bits of random.choices(['0', '1'], k=length) on the random module (or a
+  random.Random), so random.seed(84) still gives the tutorial's strings, about twice as fast
+
+    source = GeneratorBitSource(np.random.default_rng(84))
+    alice_bits, alice_bases = source.bits(10**6), source.bits(10**6)
+"""
+
+from __future__ import annotations
+
+import os
+import random
+
+import numpy as np
+
+import fast_channel
+from bitvector import BitVector, clear_padding, unpack_bits
+
+SOURCES = ("legacy", "numpy", "system")
+
+
+class BitSource:
+    """
+    Base class: subclasses implement packed(length)
+    """
+
+    def packed(self, length: int) -> np.ndarray:
+        """
+        @param length: number of bits
+        @return: packed uint8 array of length random bits (padding bits zero)
+        """
+        raise NotImplementedError
+
+    def bits(self, length: int) -> BitVector:
+        """
+        @param length: number of bits
+        @return: BitVector of length random bits
+        """
+        return BitVector(self.packed(length), length)
+
+    def string(self, length: int) -> str:
+        """
+        @param length: number of bits
+        @return: string of length random '0'/'1' characters
+        """
+        return unpack_bits(self.packed(length), length)
+
+
+class GeneratorBitSource(BitSource):
+    """
+    Bits from a numpy Generator (same stream as fast_channel.random_packed_bits)
+    @param generator: numpy.random.Generator (default: a new generator seeded with 84)
+    """
+
+    def __init__(self, generator: np.random.Generator | None = None):
+        self.generator = np.random.default_rng(84) if generator is None else generator
+
+    def packed(self, length: int) -> np.ndarray:
+        return fast_channel.random_packed_bits(length, self.generator)
+
+
+class SystemBitSource(BitSource):
+    """
+    Bits from os.urandom (not reproducible)
+    """
+
+    def packed(self, length: int) -> np.ndarray:
+        packed = np.frombuffer(os.urandom((length + 7) // 8), dtype=np.uint8).copy()
+        return clear_padding(packed, length)
+
+
+class LegacyBitSource(BitSource):
+    """
+    Bits of ''.join(random.choices(['0', '1'], k=length)), bit for bit, leaving the generator in the same state.
+    random.choices draws floor(2 * random()) per bit and random() consumes two 32-bit Mersenne Twister outputs,
+    the bit being the top bit of the first one; getrandbits(64 * length) returns the same outputs in one call.
+    @param rng: random.Random instance (default: the global generator of the random module, seeded by random.seed)
+    """
+
+    def __init__(self, rng: random.Random | None = None):
+        self.rng = rng
+
+    def packed(self, length: int) -> np.ndarray:
+        rng = random if self.rng is None else self.rng
+        words = np.frombuffer(rng.getrandbits(64 * length).to_bytes(8 * length, 'little'), dtype='<u4')
+        return np.packbits((words[0::2] >> 31).astype(np.uint8))
+
+
+def bit_source(kind: str = "numpy", seed: int | None = None) -> BitSource:
+    """
+    Build a BitSource by name
+    @param kind: "numpy", "system" or "legacy" (see SOURCES)
+    @param seed: seed of the numpy Generator or of a new random.Random (None: 84 for numpy, the global random
+                 module for legacy; ignored by system)
+    @return: BitSource
+    """
+    if kind == "numpy":
+        return GeneratorBitSource(np.random.default_rng(84 if seed is None else seed))
+    if kind == "system":
+        return SystemBitSource()
+    if kind == "legacy":
+        return LegacyBitSource(None if seed is None else random.Random(seed))
+    raise ValueError(f"Unknown bit source {kind!r}, expected one of {SOURCES}")
@@ -0,0 +1,195 @@
+"""
+Compact bit vectors for BB84 keys, bases and masks
+
+The challenge functions represent keys as str of '0'/'1' characters and masks as list[int]: 1 byte (or a full
+Python int) per bit and a Python loop per bit. BitVector stores 8 bits per byte (numpy.packbits layout, padding
+bits of the last byte always zero) and does XOR / AND / popcount / masked compress on whole arrays.
+
+The str-based functions of bb84_challenge (compare_bases, extract_key_from_measurements, reveal_key_subset,
+remove_revealed_key, bob_detect_eve) are thin adapters over this class.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+
+_POPCOUNT_TABLE = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+def pack_bits(bit_string: str) -> np.ndarray:
+    """
+    Pack a string of '0'/'1' characters into a uint8 array (8 bits per byte)
+    @param bit_string: string of bits
+    @return: packed array of ceil(len / 8) bytes
+    """
+    bits = np.frombuffer(bit_string.encode('ascii'), dtype=np.uint8) - ord('0')
+    if bits.size and bits.max() > 1:
+        raise ValueError("bit strings may only contain '0' and '1'")
+    return np.packbits(bits)
+
+
+def unpack_bits(packed: np.ndarray, length: int) -> str:
+    """
+    Unpack a packed uint8 array back into a string of '0'/'1' characters
+    @param packed: packed array
+    @param length: number of bits to keep
+    @return: string of bits
+    """
+    bits = np.unpackbits(packed, count=length) + ord('0')
+    return bits.tobytes().decode('ascii')
+
+
+def clear_padding(packed: np.ndarray, length: int) -> np.ndarray:
+    """
+    Zero the padding bits of the last byte (in place) so that packed arrays compare equal
+    @param packed: packed array
+    @param length: number of meaningful bits
+    @return: the same array
+    """
+    if length % 8:
+        packed[-1] &= np.uint8((0xFF << (8 - length % 8)) & 0xFF)
+    return packed
+
+
+def popcount(packed: np.ndarray) -> int:
+    """
+    Number of bits set in a packed array
+    @param packed: packed uint8 array
+    @return: number of 1 bits
+    """
+    if hasattr(np, "bitwise_count"): # numpy >= 2.0
+        return int(np.bitwise_count(packed).sum(dtype=np.int64))
+    return int(_POPCOUNT_TABLE[packed].sum(dtype=np.int64))
+
+
+class BitVector:
+    """
+    Fixed-length vector of bits packed 8 per byte
+    @param packed: packed uint8 array (numpy.packbits layout), used as is (not copied)
+    @param length: number of bits
+    """
+
+    __slots__ = ("packed", "length")
+
+    def __init__(self, packed: np.ndarray, length: int):
+        if packed.dtype != np.uint8 or packed.size != (length + 7) // 8:
+            raise ValueError("packed must be a uint8 array of ceil(length / 8) bytes")
+        self.packed = clear_padding(packed, length)
+        self.length = length
+
+    # Constructors:-------------------------------------------
+    @classmethod
+    def from_str(cls, bit_string: str) -> BitVector:
+        """Build from a string of '0'/'1' characters"""
+        return cls(pack_bits(bit_string), len(bit_string))
+
+    @classmethod
+    def from_bits(cls, bits) -> BitVector:
+        """Build from a sequence (list, array) of 0/1 values"""
+        bits = np.asarray(bits, dtype=np.uint8)
+        return cls(np.packbits(bits), bits.size)
+
+    @classmethod
+    def from_bytes(cls, data: bytes, length: int | None = None) -> BitVector:
+        """Build from packed bytes (length defaults to 8 bits per byte)"""
+        length = len(data) * 8 if length is None else length
+        return cls(np.frombuffer(data, dtype=np.uint8, count=(length + 7) // 8).copy(), length)
+
+    @classmethod
+    def zeros(cls, length: int) -> BitVector:
+        """Vector of length zero bits"""
+        return cls(np.zeros((length + 7) // 8, dtype=np.uint8), length)
+
+    # Conversions:--------------------------------------------
+    def to_str(self) -> str:
+        """String of '0'/'1' characters"""
+        return unpack_bits(self.packed, self.length)
+
+    def to_list(self) -> list[int]:
+        """List of 0/1 ints"""
+        return self.unpack().tolist()
+
+    def unpack(self) -> np.ndarray:
+        """Unpacked uint8 array of 0/1 values (1 byte per bit)"""
+        return np.unpackbits(self.packed, count=self.length)
+
+    def to_bytes(self) -> bytes:
+        """Packed bytes (padding bits are zero)"""
+        return self.packed.tobytes()
+
+    @property
+    def nbytes(self) -> int:
+        """Memory used by the bits"""
+        return self.packed.nbytes
+
+    # Python protocol:----------------------------------------
+    def __len__(self) -> int:
+        return self.length
+
+    def __getitem__(self, index: int) -> int:
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError("BitVector index out of range")
+        return int(self.packed[index >> 3] >> (7 - (index & 7))) & 1
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, BitVector):
+            return NotImplemented
+        return self.length == other.length and np.array_equal(self.packed, other.packed)
+
+    def __repr__(self) -> str:
+        preview = unpack_bits(self.packed[:8], min(self.length, 64))
+        return f"BitVector(length={self.length}, bits='{preview}{'...' if self.length > 64 else ''}')"
+
+    def __str__(self) -> str:
+        return self.to_str()
+
+    # Word-wide operations:-----------------------------------
+    def _check_same_length(self, other: BitVector):
+        if self.length != other.length:
+            raise ValueError(f"BitVectors have different lengths ({self.length} and {other.length})")
+
+    def __xor__(self, other: BitVector) -> BitVector:
+        self._check_same_length(other)
+        return BitVector(self.packed ^ other.packed, self.length)
+
+    def __and__(self, other: BitVector) -> BitVector:
+        self._check_same_length(other)
+        return BitVector(self.packed & other.packed, self.length)
+
+    def __or__(self, other: BitVector) -> BitVector:
+        self._check_same_length(other)
+        return BitVector(self.packed | other.packed, self.length)
+
+    def __invert__(self) -> BitVector:
+        return BitVector(~self.packed, self.length) # the constructor clears the padding bits again
+
+    def popcount(self) -> int:
+        """Number of bits set to 1"""
+        return popcount(self.packed)
+
+    def compress(self, mask: BitVector) -> BitVector:
+        """
+        Keep only the bits where mask is 1 (masked compress, order preserved)
+        @param mask: BitVector of the same length
+        @return: new BitVector of mask.popcount() bits
+        """
+        self._check_same_length(mask)
+        return BitVector.from_bits(self.unpack()[mask.unpack().view(bool)])
+
+    def take(self, indices) -> BitVector:
+        """
+        Bits at the given indices, in the given order
+        @param indices: sequence of indices
+        @return: new BitVector of len(indices) bits
+        """
+        return BitVector.from_bits(self.unpack()[np.asarray(indices, dtype=np.int64)])
+
+    def delete(self, indices) -> BitVector:
+        """
+        Remove the bits at the given indices (duplicates allowed)
+        @param indices: sequence of indices
+        @return: new BitVector without those bits
+        """
+        return BitVector.from_bits(np.delete(self.unpack(), np.asarray(indices, dtype=np.int64)))
@@ -1,3 +1,45 @@
+import functools
+
+
+def _key_bytes(key: bytes | str) -> bytes:
+    """
+    Key as bytes. A str key is mapped character by character with ord() (latin-1), like the str API does.
+    """
+    if isinstance(key, str):
+        key = key.encode('latin-1')
+    key = bytes(key)
+    if not key:
+        raise ValueError("the key must not be empty")
+    return key
+
+
+NUMPY_XOR_MIN_BYTES = 1 << 16 # buffers from this size are XORed with NumPy (imported on first use)
+
+
+def xor_repeating_key_bytes(data: bytes | bytearray | memoryview, key: bytes | str, offset: int = 0) -> bytes:
+    """
+    XOR a whole buffer with a repeating key (the same call encrypts and decrypts).
+    The key is tiled once to the length of the data, then both are XORed without a per-byte Python loop: as two
+    big integers for messages, with NumPy from NUMPY_XOR_MIN_BYTES (about 5 times faster on megabytes). NumPy is
+    only imported by that large-buffer path, so the ciphers load without it.
+    @param data: bytes-like object to encrypt or decrypt
+    @param key: the key (bytes, or str mapped with ord())
+    @param offset: position in the key of the first byte of data (to continue a stream split in chunks)
+    @return: the XORed bytes
+    """
+    key = _key_bytes(key)
+    data = memoryview(data).cast('B')
+    start = offset % len(key)
+    repeats = -(-(start + len(data)) // len(key)) # ceil division
+    tiled_key = (key * repeats)[start:start + len(data)]
+    if len(data) < NUMPY_XOR_MIN_BYTES:
+        return (int.from_bytes(data, 'little') ^ int.from_bytes(tiled_key, 'little')).to_bytes(len(data), 'little')
+
+    import numpy as np
+
+    return (np.frombuffer(data, dtype=np.uint8) ^ np.frombuffer(tiled_key, dtype=np.uint8)).tobytes()
+
+
 def encrypt_xor_repeating_key(message: str, key: str) -> str:
     """
     Encrypt the message using the repeating-key XOR algorithm.
@@ -6,11 +48,15 @@ def encrypt_xor_repeating_key(message: str, key: str) -> str:
     @param key: string representing the encryption key (much smaller than the message)
     @return: hex string representing the encrypted message
     """
-    encrypted_bytes = bytearray()
-    for i, ch in enumerate(message):
-        key_ch = key[i % len(key)]
-        encrypted_byte = ord(ch) ^ ord(key_ch)
-        encrypted_bytes.append(encrypted_byte)
+    if not message:
+        return ''
+    try:
+        encrypted_bytes = xor_repeating_key_bytes(message.encode('latin-1'), key.encode('latin-1'))
+    except UnicodeEncodeError: # characters above 255: XOR the code points one by one
+        encrypted_bytes = bytearray()
+        for i, ch in enumerate(message):
+            key_ch = key[i % len(key)]
+            encrypted_bytes.append(ord(ch) ^ ord(key_ch))
     # Return the encrypted message as a hex string for readability.
     return encrypted_bytes.hex()
 
@@ -24,12 +70,49 @@ def decrypt_xor_repeating_key(encrypted_message: str, key: str) -> str:
     """
     # Convert hex back to bytes.
     encrypted_bytes = bytes.fromhex(encrypted_message)
-    decrypted_chars = []
-    for i, byte in enumerate(encrypted_bytes):
-        key_ch = key[i % len(key)]
-        decrypted_char = chr(byte ^ ord(key_ch))
-        decrypted_chars.append(decrypted_char)
-    return "".join(decrypted_chars)
+    if not encrypted_bytes:
+        return ''
+    try:
+        return xor_repeating_key_bytes(encrypted_bytes, key.encode('latin-1')).decode('latin-1')
+    except UnicodeEncodeError: # key characters above 255: XOR the code points one by one
+        return ''.join(chr(byte ^ ord(key[i % len(key)])) for i, byte in enumerate(encrypted_bytes))
+
+
+class _CaesarTable(dict):
+    """
+    str.translate table of a Caesar shift. Entries are computed on first use with the cipher rule
+    (upper case letters shift within A-Z, lower case letters within a-z, everything else unchanged),
+    then stay in the dict, so translate() runs at C speed on every later character.
+    """
+
+    def __init__(self, shift: int):
+        super().__init__()
+        self.shift = shift
+
+    def __missing__(self, ordinal: int) -> int:
+        ch = chr(ordinal)
+        if ch.isupper():
+            shifted = (ordinal - ord('A') + self.shift) % 26 + ord('A')
+        elif ch.islower():
+            shifted = (ordinal - ord('a') + self.shift) % 26 + ord('a')
+        else:
+            shifted = ordinal
+        self[ordinal] = shifted
+        return shifted
+
+
+@functools.lru_cache(maxsize=26)
+def _cached_caesar_table(shift: int) -> _CaesarTable:
+    return _CaesarTable(shift)
+
+
+def caesar_table(shift: int) -> _CaesarTable:
+    """
+    Cached translation table of a Caesar shift (one table per shift mod 26)
+    @param shift: shift value (any int, reduced mod 26 before the cache lookup)
+    @return: table for str.translate
+    """
+    return _cached_caesar_table(shift % 26)
 
 
 def encrypt_caesar_cipher(message: str, key: str) -> str:
@@ -42,20 +125,8 @@ def encrypt_caesar_cipher(message: str, key: str) -> str:
     @return: encrypted message
     """
     # Convert the binary key to an integer shift value.
-    shift = int(key, 2)
-    result = []
-    for ch in message:
-        if ch.isupper():
-            # A-Z: shift and wrap-around (using modulo 26)
-            shifted = (ord(ch) - ord('A') + shift) % 26 + ord('A')
-            result.append(chr(shifted))
-        elif ch.islower():
-            # a-z: shift and wrap-around
-            shifted = (ord(ch) - ord('a') + shift) % 26 + ord('a')
-            result.append(chr(shifted))
-        else:
-            result.append(ch)
-    return "".join(result)
+    shift = int(key, 2) % 26
+    return message.translate(caesar_table(shift))
 
 
 def decrypt_caesar_cipher(encrypted_message: str, key: str) -> str:
@@ -68,47 +139,74 @@ def decrypt_caesar_cipher(encrypted_message: str, key: str) -> str:
     @return: decrypted message
     """
     # Convert the binary key to an integer shift value.
-    shift = int(key, 2)
-    result = []
-    for ch in encrypted_message:
-        if ch.isupper():
-            shifted = (ord(ch) - ord('A') - shift) % 26 + ord('A')
-            result.append(chr(shifted))
-        elif ch.islower():
-            shifted = (ord(ch) - ord('a') - shift) % 26 + ord('a')
-            result.append(chr(shifted))
-        else:
-            result.append(ch)
-    return "".join(result)
+    shift = int(key, 2) % 26
+    return encrypted_message.translate(caesar_table((-shift) % 26))
 
 
-def encrypt_vigenere_cipher(message: str, key: str) -> str:
+def vigenere_shifts(key: str) -> list[int]:
     """
-    Encrypt the message using the Vigenère cipher.
-    Only letters are shifted; other characters remain unchanged.
-    @param message: message to encrypt
-    @param key: string key used for shifting letters (non-letter characters in key will be ignored)
-    @return: encrypted message
+    Shift vector of a Vigenère key, computed once per call instead of once per letter
+    @param key: string key (lower-cased, as in the cipher)
+    @return: list of the shifts (mod 26) of every key character
     """
-    result = []
     key = key.lower()
+    if not key:
+        raise ValueError("the key must not be empty")
+    return [(ord(ch) - ord('a')) % 26 for ch in key]
+
+
+def _vigenere(message: str, key: str, sign: int) -> str:
+    """
+    Vigenère engine: sign=+1 encrypts, sign=-1 decrypts.
+    ASCII text is shifted in one NumPy pass over the letter positions; other text goes through the
+    per-character loop (non-ASCII letters follow the same rule as the original implementation).
+    """
+    if not key: # like the original loop, the key is only read when a letter needs a shift
+        if any(ch.isalpha() for ch in message):
+            raise ValueError("the key must not be empty")
+        return message
+    shifts = [(shift * sign) % 26 for shift in vigenere_shifts(key)]
+    if message.isascii():
+        import numpy as np # only loaded by the Vigenère fast path
+
+        codes = np.frombuffer(message.encode('ascii'), dtype=np.uint8).copy()
+        upper = (codes >= ord('A')) & (codes <= ord('Z'))
+        letters = upper | ((codes >= ord('a')) & (codes <= ord('z')))
+        letter_codes = codes[letters]
+        base = np.where(upper[letters], np.uint8(ord('A')), np.uint8(ord('a')))
+        # the key only advances on letters: tile the shift vector over the letter positions
+        repeats = -(-letter_codes.size // len(shifts))
+        tiled_shifts = np.tile(np.array(shifts, dtype=np.uint8), repeats)[:letter_codes.size]
+        codes[letters] = (letter_codes - base + tiled_shifts) % 26 + base
+        return codes.tobytes().decode('ascii')
+
+    result = []
     key_index = 0
     for ch in message:
         if ch.isalpha():
-            # Determine the shift from the key letter.
-            shift = ord(key[key_index % len(key)]) - ord('a')
+            shift = shifts[key_index % len(shifts)]
             if ch.isupper():
                 shifted = (ord(ch) - ord('A') + shift) % 26 + ord('A')
-                result.append(chr(shifted))
             else:
                 shifted = (ord(ch) - ord('a') + shift) % 26 + ord('a')
-                result.append(chr(shifted))
+            result.append(chr(shifted))
             key_index += 1
         else:
             result.append(ch)
     return "".join(result)
 
 
+def encrypt_vigenere_cipher(message: str, key: str) -> str:
+    """
+    Encrypt the message using the Vigenère cipher.
+    Only letters are shifted; other characters remain unchanged.
+    @param message: message to encrypt
+    @param key: string key used for shifting letters (non-letter characters in key will be ignored)
+    @return: encrypted message
+    """
+    return _vigenere(message, key, +1)
+
+
 def decrypt_vigenere_cipher(encrypted_message: str, key: str) -> str:
     """
     Decrypt a message encrypted using the Vigenère cipher.
@@ -117,22 +215,7 @@ def decrypt_vigenere_cipher(encrypted_message: str, key: str) -> str:
     @param key: string key used for the encryption (non-letter characters in key will be ignored)
     @return: decrypted message
     """
-    result = []
-    key = key.lower()
-    key_index = 0
-    for ch in encrypted_message:
-        if ch.isalpha():
-            shift = ord(key[key_index % len(key)]) - ord('a')
-            if ch.isupper():
-                shifted = (ord(ch) - ord('A') - shift) % 26 + ord('A')
-                result.append(chr(shifted))
-            else:
-                shifted = (ord(ch) - ord('a') - shift) % 26 + ord('a')
-                result.append(chr(shifted))
-            key_index += 1
-        else:
-            result.append(ch)
-    return "".join(result)
+    return _vigenere(encrypted_message, key, -1)
 
 
 # test message 1:
@@ -0,0 +1,228 @@
+"""
+Eve attack strategies and their QBER vs information-gain trade-off
+
+eve_intercept_qubits models one attack: Eve intercepts every qubit, measures it in a random basis (Z or X) and
+resends what she measured. Here an attack is a strategy object deciding, qubit by qubit, whether Eve intercepts it
+and in which basis she measures and resends it:
+
+- InterceptResend(fraction): a fraction of the qubits, random Z/X basis
+- FixedBasis(fraction, basis): a fraction of the qubits, always the same basis ("z" or "x")
+- Breidbart(fraction): a fraction of the qubits, in the Breidbart basis (halfway between Z and X on the Bloch
+  circle), which maximizes the probability that Eve guesses each bit right
+
+New strategies subclass Attack and return the packed masks of the qubits measured in each of SETTINGS.
+
+The simulation is closed form on packed bit arrays (BitVector), like fast_channel: measuring a state at Bloch
+angle theta along an axis at angle phi flips the bit with probability sin^2((theta - phi) / 2), so every flip
+is a packed Bernoulli mask (a coin flip for orthogonal axes, nothing for aligned ones, sin^2(pi/8) for the
+Breidbart axis). evaluate() returns the QBER Bob sees on the sifted key and the information Eve gains on it:
+the mutual information between Alice's bit and Eve's guess, knowing the bases announced during sifting
+(theory: QBER = f/4 for all three attacks; information f/2 for InterceptResend and FixedBasis, f (1 - h(0.146))
+= 0.40 f for Breidbart, which guesses 85 % of the bits but learns less).
+
+attack_grid() evaluates attacks x fractions in parallel (parallel_sessions.parallel_map), and
+max_tolerable_qber() turns the curves into a threshold for bob_detect_eve.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, replace
+
+import numpy as np
+
+import parallel_sessions
+from bit_source import GeneratorBitSource
+from bitvector import BitVector
+from privacy_amplification import binary_entropy
+
+SETTINGS = ("z", "x", "breidbart") # measurement axes of Eve, at Bloch angles 0, pi/2 and pi/4
+BREIDBART_ERROR = float(np.sin(np.pi / 8) ** 2) # flip probability between the Breidbart axis and Z or X
+
+
+# Strategies:----------------------------------------------
+@dataclass(frozen=True)
+class Attack:
+    """
+    Base class of the strategies
+    @param fraction: probability that Eve intercepts a qubit
+    """
+    fraction: float = 1.0
+
+    def __post_init__(self):
+        if not 0.0 <= self.fraction <= 1.0:
+            raise ValueError(f"fraction must be a probability, got {self.fraction}")
+
+    @property
+    def name(self) -> str:
+        return type(self).__name__
+
+    def settings(self, length: int, rng: np.random.Generator) -> dict[str, BitVector]:
+        """
+        Which qubits Eve measures, and along which axis
+        @param length: number of qubits
+        @param rng: random generator
+        @return: {setting: mask of the qubits measured with it} for settings of SETTINGS (disjoint masks)
+        """
+        raise NotImplementedError
+
+    def _intercepted(self, length: int, rng: np.random.Generator) -> BitVector:
+        return bernoulli(length, self.fraction, rng)
+
+
+@dataclass(frozen=True)
+class InterceptResend(Attack):
+    """Intercept-resend in a random Z/X basis (eve_intercept_qubits when fraction = 1)"""
+
+    def settings(self, length: int, rng: np.random.Generator) -> dict[str, BitVector]:
+        intercepted = self._intercepted(length, rng)
+        x_basis = GeneratorBitSource(rng).bits(length)
+        return {"z": intercepted & ~x_basis, "x": intercepted & x_basis}
+
+
+@dataclass(frozen=True)
+class FixedBasis(Attack):
+    """Intercept-resend always in the same basis"""
+    basis: str = "z"
+
+    def __post_init__(self):
+        super().__post_init__()
+        if self.basis not in ("z", "x"):
+            raise ValueError(f"basis must be 'z' or 'x', got {self.basis!r}")
+
+    @property
+    def name(self) -> str:
+        return f"FixedBasis-{self.basis}"
+
+    def settings(self, length: int, rng: np.random.Generator) -> dict[str, BitVector]:
+        return {self.basis: self._intercepted(length, rng)}
+
+
+@dataclass(frozen=True)
+class Breidbart(Attack):
+    """Intercept-resend in the Breidbart basis"""
+
+    def settings(self, length: int, rng: np.random.Generator) -> dict[str, BitVector]:
+        return {"breidbart": self._intercepted(length, rng)}
+
+
+ATTACKS = {"intercept_resend": InterceptResend, "fixed_basis": FixedBasis, "breidbart": Breidbart}
+
+
+# Simulation:----------------------------------------------
+def bernoulli(length: int, probability: float, rng: np.random.Generator) -> BitVector:
+    """
+    Packed mask where every bit is set with the given probability
+    @param length: number of bits
+    @param probability: probability of a 1
+    @param rng: random generator
+    @return: BitVector
+    """
+    if probability <= 0.0:
+        return BitVector.zeros(length)
+    if probability == 0.5:
+        return GeneratorBitSource(rng).bits(length)
+    if probability >= 1.0:
+        return ~BitVector.zeros(length)
+    return BitVector.from_bits(rng.random(length) < probability)
+
+
+def _flips(setting: str, bases: BitVector, rng: np.random.Generator) -> BitVector:
+    """Bit flips of states prepared in bases (0: Z, 1: X) measured along the axis of setting"""
+    length = len(bases)
+    if setting == "breidbart":
+        return bernoulli(length, BREIDBART_ERROR, rng)
+    mismatched = ~bases if setting == "x" else bases
+    return GeneratorBitSource(rng).bits(length) & mismatched
+
+
+@dataclass
+class AttackPoint:
+    """
+    One point of a QBER vs information curve
+    @param attack: name of the strategy
+    @param fraction: interception probability
+    @param sifted_bits: length of the sifted key
+    @param qber: error rate of Bob's sifted key
+    @param eve_information: Eve's mutual information per sifted bit, knowing the announced bases
+    @param eve_guess_rate: fraction of the sifted bits Eve guesses right (coin flip when she did not intercept)
+    """
+    attack: str
+    fraction: float
+    sifted_bits: int
+    qber: float
+    eve_information: float
+    eve_guess_rate: float
+
+
+def evaluate(attack: Attack, numqubits: int, rng: np.random.Generator | None = None) -> AttackPoint:
+    """
+    Run one session under the attack and measure Bob's QBER and Eve's information
+    @param attack: strategy
+    @param numqubits: qubits sent by Alice
+    @param rng: random generator (default: a new generator seeded with 84)
+    @return: AttackPoint
+    """
+    rng = np.random.default_rng(84) if rng is None else rng
+    source = GeneratorBitSource(rng)
+    alice_bits, alice_bases, bob_bases = source.bits(numqubits), source.bits(numqubits), source.bits(numqubits)
+    settings = attack.settings(numqubits, rng)
+
+    # Eve measures (her guess is a coin flip on the qubits she leaves alone) and resends along her axis
+    eve_guess = source.bits(numqubits)
+    bob_results = alice_bits ^ _flips("z", alice_bases ^ bob_bases, rng) # untouched qubits: coin if bases differ
+    for setting, mask in settings.items():
+        measured = alice_bits ^ _flips(setting, alice_bases, rng)
+        eve_guess = (eve_guess & ~mask) | (measured & mask)
+        resent = measured ^ _flips(setting, bob_bases, rng)
+        bob_results = (bob_results & ~mask) | (resent & mask)
+
+    sifted = ~(alice_bases ^ bob_bases)
+    sifted_bits = sifted.popcount()
+    errors = ((alice_bits ^ bob_results) & sifted).popcount()
+    eve_errors = (alice_bits ^ eve_guess) & sifted
+
+    # I(A; E | bases) = sum over the groups Eve can tell apart (her setting, the announced basis) of 1 - h(error)
+    information = 0.0
+    for setting, mask in settings.items():
+        for basis in (alice_bases, ~alice_bases):
+            group = mask & basis & sifted
+            size = group.popcount()
+            if size:
+                information += size * (1.0 - binary_entropy((eve_errors & group).popcount() / size))
+
+    return AttackPoint(attack=attack.name, fraction=attack.fraction, sifted_bits=sifted_bits,
+                       qber=errors / sifted_bits if sifted_bits else 0.0,
+                       eve_information=information / sifted_bits if sifted_bits else 0.0,
+                       eve_guess_rate=1.0 - eve_errors.popcount() / sifted_bits if sifted_bits else 0.0)
+
+
+def _evaluate_seeded(attack: Attack, seed_sequence: np.random.SeedSequence, numqubits: int) -> AttackPoint:
+    return evaluate(attack, numqubits, np.random.default_rng(seed_sequence))
+
+
+# Curves:--------------------------------------------------
+def attack_grid(attacks: list[Attack], fractions: list[float], numqubits: int = 10**5, seed: int = 84,
+                workers: int | None = None) -> list[AttackPoint]:
+    """
+    Evaluate every strategy at every interception fraction, in parallel
+    @param attacks: strategies (their own fraction is replaced by each value of fractions)
+    @param fractions: interception probabilities
+    @param numqubits: qubits per grid point
+    @param seed: root seed, every grid point gets its own derived stream
+    @param workers: worker processes (see parallel_sessions.parallel_map)
+    @return: AttackPoints, attack by attack, in the order of fractions
+    """
+    grid = [replace(attack, fraction=fraction) for attack in attacks for fraction in fractions]
+    seeds = np.random.SeedSequence(seed).spawn(len(grid))
+    return parallel_sessions.parallel_map(_evaluate_seeded, grid, seeds, [numqubits] * len(grid), workers=workers)
+
+
+def max_tolerable_qber(points: list[AttackPoint], max_information: float) -> float:
+    """
+    Detection threshold for bob_detect_eve: the lowest QBER at which some attack of the grid learns more than
+    max_information bits per sifted bit (sessions must be rejected from there on)
+    @param points: output of attack_grid
+    @param max_information: information per sifted bit Eve may have (e.g. what privacy amplification removes)
+    @return: QBER threshold (1.0 when no point of the grid exceeds max_information)
+    """
+    return min((point.qber for point in points if point.eve_information > max_information), default=1.0)
@@ -0,0 +1,142 @@
+"""
+Fast BB84 quantum channel (pure NumPy, no QuantumCircuit)
+
+Every BB84 qubit is a Clifford circuit with a closed-form outcome:
+- measured in the same basis as it was prepared: the result is the encoded bit
+- measured in the other basis: the result is a fair coin flip
+
+So the whole channel can be simulated on packed bit arrays (8 qubits per byte, numpy.packbits layout):
+
+    result = (bits & ~(prep_bases ^ meas_bases)) | (coins & (prep_bases ^ meas_bases))
+
+This module is the "numpy" backend of bb84_challenge (alice_prepare_qubits(..., backend="numpy")).
+"""
+
+from __future__ import annotations
+
+import numpy as np
+
+from bitvector import pack_bits, unpack_bits, clear_padding
+
+rng = np.random.default_rng(84) # default generator of the channel coin flips (same seed as bb84_challenge)
+
+
+class PackedQubits:
+    """
+    Qubits travelling on the channel, stored as packed bit arrays
+    @param bits: packed array (uint8) of the encoded bits
+    @param bases: packed array (uint8) of the preparation bases
+    @param length: number of qubits (the last byte may be padded with zeros)
+    """
+
+    def __init__(self, bits: np.ndarray, bases: np.ndarray, length: int):
+        if bits.shape != bases.shape or bits.size != (length + 7) // 8:
+            raise ValueError("bits and bases must be packed arrays of the same length")
+        self.bits = bits
+        self.bases = bases
+        self.length = length
+
+    def __len__(self) -> int:
+        return self.length
+
+
+# Random bits:--------------------------------------------
+def random_packed_bits(length: int, generator: np.random.Generator | None = None) -> np.ndarray:
+    """
+    Draw length fair random bits, packed
+    @param length: number of bits
+    @param generator: random generator (default: the module generator)
+    @return: packed array of random bits
+    """
+    generator = rng if generator is None else generator
+    packed = generator.integers(0, 256, size=(length + 7) // 8, dtype=np.uint8)
+    return clear_padding(packed, length)
+
+
+# Channel:-------------------------------------------------
+def prepare(bits: np.ndarray, bases: np.ndarray, length: int) -> PackedQubits:
+    """
+    Alice prepares the qubits (packed version of alice_prepare_qubits)
+    @param bits: packed bits to encode
+    @param bases: packed preparation bases (0: standard, 1: diagonal)
+    @param length: number of qubits
+    @return: the prepared qubits
+    """
+    return PackedQubits(bits.copy(), bases.copy(), length)
+
+
+def measure(qubits: PackedQubits, bases: np.ndarray, generator: np.random.Generator | None = None) -> np.ndarray:
+    """
+    Measure the qubits in the given bases (packed version of bob_measure_qubits)
+    @param qubits: the qubits to measure
+    @param bases: packed measurement bases
+    @param generator: random generator for the coin flips of mismatched bases
+    @return: packed measurement results
+    """
+    if bases.shape != qubits.bases.shape:
+        raise ValueError("the number of bases must match the number of qubits")
+    mismatch = qubits.bases ^ bases
+    coins = random_packed_bits(qubits.length, generator)
+    return (qubits.bits & ~mismatch) | (coins & mismatch)
+
+
+def intercept(qubits: PackedQubits, bases: np.ndarray,
+              generator: np.random.Generator | None = None) -> tuple[PackedQubits, np.ndarray]:
+    """
+    Intercept-resend attack (packed version of eve_intercept_qubits)
+    @param qubits: the qubits sent by Alice
+    @param bases: packed bases in which Eve measures (and re-prepares)
+    @param generator: random generator for the coin flips of mismatched bases
+    @return: tuple (new qubits for Bob, packed bits measured by Eve)
+    """
+    measured = measure(qubits, bases, generator)
+    return prepare(measured, bases, qubits.length), measured
+
+
+# String adapters (used by bb84_challenge):---------------
+def prepare_qubits(alice_bits: str, alice_bases: str) -> PackedQubits:
+    """
+    Alice prepares the qubits from bit strings
+    @param alice_bits: string of bits
+    @param alice_bases: string of bases
+    @return: the prepared qubits
+    """
+    if len(alice_bits) != len(alice_bases):
+        raise ValueError("alice_bits and alice_bases must have the same length")
+    return prepare(pack_bits(alice_bits), pack_bits(alice_bases), len(alice_bits))
+
+
+def measure_qubits(qubits: PackedQubits, bases: str) -> str:
+    """
+    Measure the qubits in the given bases
+    @param qubits: the qubits to measure
+    @param bases: string of bases
+    @return: string of measured bits
+    """
+    return unpack_bits(measure(qubits, pack_bits(bases)), qubits.length)
+
+
+def intercept_qubits(qubits: PackedQubits, eve_bases: str) -> tuple[PackedQubits, str]:
+    """
+    Eve measures the qubits in her bases and re-prepares them for Bob
+    @param qubits: the qubits sent by Alice
+    @param eve_bases: string of Eve's bases
+    @return: tuple (new qubits for Bob, string of bits measured by Eve)
+    """
+    new_qubits, measured = intercept(qubits, pack_bits(eve_bases))
+    return new_qubits, unpack_bits(measured, qubits.length)
+
+
+def agreement_rates(alice_bits: str, alice_bases: str, bob_bases: str, bob_results: str) -> tuple[float, float]:
+    """
+    Fraction of Bob's results equal to Alice's bits, for matching and for mismatched bases.
+    Used to check a backend statistically: ideally (1.0, ~0.5) without Eve and (~0.75, ~0.5) with Eve.
+    @return: tuple (agreement when the bases match, agreement when they differ)
+    """
+    length = len(alice_bits)
+    bits = np.unpackbits(pack_bits(alice_bits), count=length)
+    same_basis = np.unpackbits(pack_bits(alice_bases) ^ pack_bits(bob_bases), count=length) == 0
+    agree = bits == np.unpackbits(pack_bits(bob_results), count=length)
+    same_rate = float(agree[same_basis].mean()) if same_basis.any() else float('nan')
+    diff_rate = float(agree[~same_basis].mean()) if (~same_basis).any() else float('nan')
+    return same_rate, diff_rate
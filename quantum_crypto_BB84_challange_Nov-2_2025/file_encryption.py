@@ -0,0 +1,119 @@
+"""
+Streaming file encryption / decryption with the repeating-key XOR algorithm
+
+Two file formats are supported:
+- raw binary files: the whole file is one XOR stream. It is read through mmap in chunks of chunk_size bytes,
+  and every chunk is XORed with the key phase of its position in the file (offset), so the output is the same
+  as XORing the file in one piece while peak memory stays at one chunk whatever the size of the file.
+- message files ("id: hex" per line, like encrypted_messages_part1.txt): every line is an independent message
+  (the key restarts at its first character), read and decrypted one line at a time.
+"""
+
+from __future__ import annotations
+
+import mmap
+import os
+from typing import Iterable, Iterator
+
+import encryption_algorithms as enc
+from encryption_algorithms import xor_repeating_key_bytes
+
+CHUNK_SIZE = 1 << 20 # bytes XORed at once in the raw binary mode (1 MiB)
+
+
+# Raw binary files:----------------------------------------
+def xor_file(src: str | os.PathLike, dst: str | os.PathLike, key: bytes | str, chunk_size: int = CHUNK_SIZE) -> int:
+    """
+    XOR a whole file with a repeating key, chunk by chunk (the same call encrypts and decrypts)
+    @param src: file to read
+    @param dst: file to write (must not be src)
+    @param key: the key (bytes, or str mapped with ord() as in encrypt_xor_repeating_key)
+    @param chunk_size: number of bytes XORed at once
+    @return: number of bytes written
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be >= 1")
+    if os.path.exists(dst) and os.path.samefile(src, dst):
+        raise ValueError("src and dst must be different files")
+    with open(src, 'rb') as fin, open(dst, 'wb') as fout:
+        size = os.fstat(fin.fileno()).st_size
+        if size == 0:
+            return 0 # an empty file cannot be memory-mapped
+        with mmap.mmap(fin.fileno(), 0, access=mmap.ACCESS_READ) as mapped, memoryview(mapped) as view:
+            for start in range(0, size, chunk_size):
+                fout.write(xor_repeating_key_bytes(view[start:start + chunk_size], key, offset=start))
+    return size
+
+
+def encrypt_file(src: str | os.PathLike, dst: str | os.PathLike, key: bytes | str, chunk_size: int = CHUNK_SIZE) -> int:
+    """
+    Encrypt a binary file with the repeating-key XOR algorithm (see xor_file)
+    @return: number of bytes written
+    """
+    return xor_file(src, dst, key, chunk_size)
+
+
+def decrypt_file(src: str | os.PathLike, dst: str | os.PathLike, key: bytes | str, chunk_size: int = CHUNK_SIZE) -> int:
+    """
+    Decrypt a binary file encrypted with encrypt_file (see xor_file)
+    @return: number of bytes written
+    """
+    return xor_file(src, dst, key, chunk_size)
+
+
+# "id: hex" message files:----------------------------------
+def iter_messages(filename: str | os.PathLike) -> Iterator[tuple[str, str]]:
+    """
+    Read a message file one line at a time
+    @param filename: file of "id: hex" lines (other lines are skipped)
+    @return: iterator of (message id, hex ciphertext)
+    """
+    with open(filename, "r") as f:
+        for line in f:
+            if ": " in line:
+                msg_id, encrypted = line.split(": ", 1)
+                yield msg_id, encrypted.strip()
+
+
+def iter_decrypted_messages(filename: str | os.PathLike, key: str) -> Iterator[tuple[str, str]]:
+    """
+    Read a message file one line at a time and decrypt every message
+    @param filename: file of "id: hex" lines (other lines are skipped)
+    @param key: the key used by encrypt_xor_repeating_key
+    @return: iterator of (message id, decrypted message)
+    """
+    for msg_id, encrypted in iter_messages(filename):
+        yield msg_id, enc.decrypt_xor_repeating_key(encrypted, key)
+
+
+def encrypt_messages_file(messages: Iterable[str], filename: str | os.PathLike, key: str, prefix: str = "Message") -> int:
+    """
+    Encrypt messages one at a time and write them as "<prefix> <n>: hex" lines (n starts at 1)
+    @param messages: iterable of messages (can be a generator)
+    @param filename: file to write
+    @param key: the key (same as encrypt_xor_repeating_key)
+    @param prefix: message id prefix
+    @return: number of messages written
+    """
+    count = 0
+    with open(filename, "w") as f:
+        for count, message in enumerate(messages, start=1):
+            encrypted = enc.encrypt_xor_repeating_key(message, key)
+            f.write(f"{prefix} {count}: {encrypted}\n")
+    return count
+
+
+def decrypt_messages_file(src: str | os.PathLike, dst: str | os.PathLike, key: str) -> int:
+    """
+    Decrypt a message file into a plain text file of "id: message" lines, one line at a time
+    @param src: file of "id: hex" lines
+    @param dst: file to write
+    @param key: the key used by encrypt_xor_repeating_key
+    @return: number of messages written
+    """
+    count = 0
+    with open(dst, "w", encoding="utf-8") as f:
+        for msg_id, decrypted in iter_decrypted_messages(src, key):
+            f.write(f"{msg_id}: {decrypted}\n")
+            count += 1
+    return count
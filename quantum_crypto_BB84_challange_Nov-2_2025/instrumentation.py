@@ -0,0 +1,140 @@
+"""
+Opt-in instrumentation of the BB84 protocol drivers
+
+    inst = Instrumentation(trace_memory=True)
+    key = bb84_protocol_eve_is_here(eve_present=False, instrument=inst, quiet=True)
+    print(inst.summary())
+    inst.export_json("run.json")
+
+Every stage (prepare, intercept, measure, sift, reveal, detect, distill) is wrapped in inst.stage(name), which
+records its duration, the number of simulator jobs and shots it ran (simulator_stats, incremented by
+bb84_challenge.run_circuits) and, with trace_memory=True, the peak memory it allocated (tracemalloc).
+Results such as the sifted and final key lengths are stored with inst.count(name, value).
+Hooks registered with on_stage are called with every StageRecord as soon as the stage ends.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import json
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from typing import Callable, Iterator
+
+simulator_stats = {"jobs": 0, "shots": 0} # process-wide counters of the simulator jobs and shots (all circuits)
+
+
+@dataclass
+class StageRecord:
+    """
+    Measurements of one execution of a stage
+    """
+    stage: str
+    duration_s: float
+    simulator_jobs: int
+    shots: int
+    peak_bytes: int | None # None when memory tracing is off
+
+
+class Instrumentation:
+    """
+    Collects StageRecords and counters for one or several protocol runs
+    @param trace_memory: measure the peak memory of every stage with tracemalloc (slows the run down)
+    @param on_stage: optional hook called with every StageRecord
+    """
+
+    def __init__(self, trace_memory: bool = False, on_stage: Callable[[StageRecord], None] | None = None):
+        self.trace_memory = trace_memory
+        self.hooks = [] if on_stage is None else [on_stage]
+        self.records: list[StageRecord] = []
+        self.counters: dict[str, float] = {}
+
+    def add_hook(self, hook: Callable[[StageRecord], None]):
+        """Register a function called with every StageRecord"""
+        self.hooks.append(hook)
+
+    @contextlib.contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """
+        Context manager measuring one stage
+        @param name: stage name
+        """
+        jobs, shots = simulator_stats["jobs"], simulator_stats["shots"]
+        started_tracing = False
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                started_tracing = True
+            tracemalloc.reset_peak()
+            memory_before = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start
+            peak = None
+            if self.trace_memory:
+                peak = max(0, tracemalloc.get_traced_memory()[1] - memory_before)
+                if started_tracing:
+                    tracemalloc.stop()
+            record = StageRecord(stage=name, duration_s=duration, simulator_jobs=simulator_stats["jobs"] - jobs,
+                                 shots=simulator_stats["shots"] - shots, peak_bytes=peak)
+            self.records.append(record)
+            for hook in self.hooks:
+                hook(record)
+
+    def count(self, name: str, value: float):
+        """
+        Store a counter (e.g. sifted_key_length); an existing counter is overwritten
+        @param name: counter name
+        @param value: counter value
+        """
+        self.counters[name] = value
+
+    def summary(self) -> dict:
+        """
+        Totals per stage (in first-seen order) and the counters
+        @return: {"stages": {name: {calls, total_s, simulator_jobs, shots, peak_bytes}}, "counters": {...}}
+        """
+        stages = {}
+        for record in self.records:
+            total = stages.setdefault(record.stage, {"calls": 0, "total_s": 0.0, "simulator_jobs": 0, "shots": 0,
+                                                     "peak_bytes": None})
+            total["calls"] += 1
+            total["total_s"] += record.duration_s
+            total["simulator_jobs"] += record.simulator_jobs
+            total["shots"] += record.shots
+            if record.peak_bytes is not None:
+                total["peak_bytes"] = max(total["peak_bytes"] or 0, record.peak_bytes)
+        return {"stages": stages, "counters": dict(self.counters)}
+
+    def export_json(self, filename: str):
+        """
+        Write the summary and every record to a JSON file
+        @param filename: file to write
+        """
+        with open(filename, "w") as f:
+            json.dump({**self.summary(), "records": [asdict(record) for record in self.records]}, f, indent=2)
+
+    def format_summary(self) -> str:
+        """
+        Human readable table of the summary
+        @return: multi-line string
+        """
+        summary = self.summary()
+        lines = [f"{'stage':<10} {'calls':>5} {'time (ms)':>12} {'jobs':>8} {'shots':>10} {'peak (KiB)':>11}"]
+        for name, total in summary["stages"].items():
+            peak = "-" if total["peak_bytes"] is None else f"{total['peak_bytes'] / 1024:.1f}"
+            lines.append(f"{name:<10} {total['calls']:>5} {total['total_s'] * 1e3:>12.3f} {total['simulator_jobs']:>8} "
+                         f"{total['shots']:>10} {peak:>11}")
+        for name, value in summary["counters"].items():
+            lines.append(f"{name}: {value}")
+        return "\n".join(lines)
+
+
+def stage(instrument: Instrumentation | None, name: str) -> contextlib.AbstractContextManager:
+    """
+    instrument.stage(name), or a no-op context manager when instrumentation is off (instrument is None)
+    """
+    return contextlib.nullcontext() if instrument is None else instrument.stage(name)
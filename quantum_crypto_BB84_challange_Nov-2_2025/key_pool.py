@@ -0,0 +1,249 @@
+"""
+Persistent pool of BB84 key material, used like a one-time pad
+
+main() generates a key and repeats it as a short repeating XOR key. With a key pool the key material is generated
+ahead of time (e.g. from key_stream) and every byte is used at most once:
+
+    pool = KeyPool("alice.pool")
+    for chunk in key_stream.key_stream(block_size=1 << 16, blocks=100):
+        pool.append(chunk)
+    reservation, ciphertext = pool.encrypt(b"attack at dawn")   # Bob: pool.decrypt(reservation, ciphertext)
+
+Storage:
+- <path>         raw key bytes, appended block after block; read through mmap, never loaded wholesale
+- <path>.index   JSON {"size": committed bytes, "reserved": bytes handed out, "gaps": [[start, end], ...]}: bytes
+                 [0, reserved) are consumed except the gaps, bytes [reserved, size) are available. Rewritten
+                 atomically (os.replace) after every change.
+- <path>.lock    lock file (fcntl.flock), so several processes can share the pool
+
+reserve() only moves the "reserved" offset under the lock, so concurrent encryptors (threads or processes) get
+non-overlapping slices cheaply. decrypt() consumes the sender's slice in the receiver's pool too, so a pad byte
+encrypts a single message whichever side sends it: the "reserved" offset moves past the slice, and the bytes it
+jumps over (slices of messages still in flight) are kept as gaps, which can be decrypted once but never reserved.
+Data is written and flushed before the index is updated: after a crash the pool reopens at its last committed
+state (bytes past "size" are truncated).
+
+Every reserve() fsyncs the index before returning: a reservation lost in a crash would hand the same pad bytes out
+again (a two-time pad). To encrypt many small messages, reserve once for the batch and split the slice.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import json
+import mmap
+import os
+import threading
+from dataclasses import dataclass
+
+from bitvector import BitVector
+from encryption_algorithms import xor_repeating_key_bytes
+
+try:
+    import fcntl # POSIX only: without it the pool is only safe between the threads of one process
+except ImportError: # pragma: no cover
+    fcntl = None
+
+
+@dataclass(frozen=True)
+class Reservation:
+    """
+    A slice of the pool handed out to one user
+    @param offset: position of the first byte in the pool
+    @param length: number of bytes
+    """
+    offset: int
+    length: int
+
+
+class KeyPool:
+    """
+    Append-only key store with consumption tracking
+    @param path: data file (created if missing, with its .index and .lock files)
+    """
+
+    def __init__(self, path: str | os.PathLike):
+        self.path = os.fspath(path)
+        self.index_path = self.path + ".index"
+        self.lock_path = self.path + ".lock"
+        self._thread_lock = threading.Lock()
+        self._map = None
+        self._size = 0 # committed size seen in the last index read or write (grows only)
+        with self._locked() as index:
+            # recover from an interrupted append: drop the bytes that were never committed in the index
+            if os.path.getsize(self.path) > index["size"]:
+                os.truncate(self.path, index["size"])
+
+    # Locking and index:---------------------------------------
+    def _read_index(self) -> dict:
+        try:
+            with open(self.index_path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"size": 0, "reserved": 0, "gaps": []}
+
+    def _write_index(self, index: dict):
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(index, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.index_path)
+        self._size = index["size"]
+
+    @contextlib.contextmanager
+    def _locked(self):
+        """Hold the thread lock and the file lock, yield the current index"""
+        with self._thread_lock, open(self.lock_path, "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                if not os.path.exists(self.path):
+                    open(self.path, "ab").close()
+                index = self._read_index()
+                self._size = index["size"]
+                yield index
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    # Pool state:----------------------------------------------
+    def stats(self) -> dict:
+        """
+        @return: {"size": committed bytes, "reserved": end of the consumed bytes, "available": bytes left}
+        """
+        with self._locked() as index:
+            return {"size": index["size"], "reserved": index["reserved"],
+                    "available": index["size"] - index["reserved"]}
+
+    @property
+    def available(self) -> int:
+        """Number of key bytes that can still be reserved"""
+        return self.stats()["available"]
+
+    # Writing:-------------------------------------------------
+    def append(self, key: BitVector | bytes) -> int:
+        """
+        Append key material at the end of the pool (a BitVector is stored by whole bytes: the last len % 8 bits
+        are dropped)
+        @param key: key block
+        @return: number of bytes appended
+        """
+        data = key.packed[:len(key) // 8].tobytes() if isinstance(key, BitVector) else bytes(key)
+        if not data:
+            return 0
+        with self._locked() as index:
+            with open(self.path, "r+b") as f:
+                f.seek(index["size"])
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            index["size"] += len(data)
+            self._write_index(index)
+        return len(data)
+
+    # Reading:-------------------------------------------------
+    def reserve(self, length: int) -> Reservation:
+        """
+        Reserve the next length unused bytes (never handed out again, even after a restart). The index is fsynced
+        before the slice is returned (see the module docstring): reserve once for a batch of messages
+        @param length: number of bytes
+        @return: Reservation
+        """
+        if length < 1:
+            raise ValueError("length must be >= 1")
+        with self._locked() as index:
+            if index["size"] - index["reserved"] < length:
+                raise ValueError(f"not enough key material: {length} bytes requested, "
+                                 f"{index['size'] - index['reserved']} available")
+            reservation = Reservation(index["reserved"], length)
+            index["reserved"] += length
+            self._write_index(index)
+        return reservation
+
+    def read(self, reservation: Reservation) -> bytes:
+        """
+        Key bytes of a reservation, read through mmap
+        @param reservation: slice returned by reserve
+        @return: the key bytes
+        @raise ValueError: if the slice is not inside the committed bytes of the pool
+        """
+        start, end = reservation.offset, reservation.offset + reservation.length
+        if end > self._size:
+            with self._locked(): # another process may have committed more bytes since: read the index again
+                pass
+        if start < 0 or reservation.length < 0 or end > self._size:
+            raise ValueError("reservation is outside the pool")
+        with self._thread_lock:
+            if self._map is None or len(self._map) < end:
+                if self._map is not None:
+                    self._map.close()
+                with open(self.path, "rb") as f:
+                    self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            if len(self._map) < end:
+                raise ValueError("reservation is outside the pool")
+            return self._map[start:end]
+
+    def consume(self, reservation: Reservation):
+        """
+        Mark a slice reserved by the other party as used in this pool (it will never be reserved here)
+        @param reservation: the other party's reservation
+        @raise ValueError: if the slice is outside the pool or already (even partly) consumed
+        """
+        start, end = reservation.offset, reservation.offset + reservation.length
+        with self._locked() as index:
+            gaps = index.setdefault("gaps", [])
+            if start < 0 or end > index["size"]:
+                raise ValueError("reservation is outside the pool")
+            if start >= index["reserved"]:
+                if start > index["reserved"]:
+                    gaps.append([index["reserved"], start])
+                index["reserved"] = end
+            else:
+                gap = next((gap for gap in gaps if gap[0] <= start and end <= gap[1]), None)
+                if gap is None:
+                    raise ValueError(f"key bytes [{start}, {end}) were already consumed")
+                gaps.remove(gap)
+                gaps.extend([left, right] for left, right in ((gap[0], start), (end, gap[1])) if left < right)
+                gaps.sort()
+            self._write_index(index)
+
+    # One-time pad:--------------------------------------------
+    def encrypt(self, data: bytes | bytearray | memoryview) -> tuple[Reservation, bytes]:
+        """
+        Encrypt data with fresh key bytes (one-time pad: key as long as the data, never reused)
+        @param data: bytes to encrypt
+        @return: tuple (reservation to send with the ciphertext, ciphertext)
+        """
+        if not data:
+            return Reservation(0, 0), b""
+        reservation = self.reserve(len(data))
+        return reservation, xor_repeating_key_bytes(data, self.read(reservation))
+
+    def decrypt(self, reservation: Reservation, ciphertext: bytes | bytearray | memoryview) -> bytes:
+        """
+        Decrypt with the key bytes of the sender's reservation (the receiver's pool holds the same key material).
+        The slice is consumed: it is never reserved by this pool and cannot be decrypted twice.
+        @param reservation: reservation sent with the ciphertext
+        @param ciphertext: encrypted bytes
+        @return: plaintext
+        """
+        if reservation.length != len(ciphertext):
+            raise ValueError("the reservation and the ciphertext have different lengths")
+        if not ciphertext:
+            return b""
+        self.consume(reservation)
+        return xor_repeating_key_bytes(ciphertext, self.read(reservation))
+
+    def close(self):
+        """Release the memory map"""
+        with self._thread_lock:
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+
+    def __enter__(self) -> KeyPool:
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
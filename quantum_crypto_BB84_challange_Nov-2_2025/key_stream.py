@@ -0,0 +1,231 @@
+"""
+Streaming BB84 session engine
+
+bb84_protocol_no_eve / bb84_protocol_eve_is_here run one session of 100 qubits with every string in memory.
+Here the protocol runs on successive blocks of qubits:
+
+    prepare -> (intercept) -> measure -> sift -> reveal -> detect -> (reconcile) -> (amplify)
+
+and the secret key of each block is yielded as soon as it is ready, while SessionStats keeps the running
+statistics (sifted bits, revealed errors, QBER, aborted blocks). Memory is bounded by the block size, so key
+generation can run for as long as the consumer keeps reading, e.g.:
+
+    stats = SessionStats()
+    for chunk in key_stream(block_size=1 << 16, chunk_bits=1024, stats=stats):
+        encryptor.feed(chunk.to_bytes())
+
+Everything inside a block is bit-packed (bitvector.BitVector); with backend="numpy" no QuantumCircuit is built.
+"""
+
+from __future__ import annotations
+
+import itertools
+from dataclasses import dataclass
+from typing import Iterator
+
+import numpy as np
+
+import bb84_challenge as bb84
+import fast_channel
+import privacy_amplification
+import reconciliation
+from bit_source import GeneratorBitSource
+from bitvector import BitVector
+
+
+@dataclass
+class KeyBlock:
+    """
+    Result of one block of the protocol
+    @param index: block number in the session
+    @param qubits: number of qubits sent by Alice
+    @param sifted_bits: length of the raw key (matching bases)
+    @param revealed_bits: number of raw key bits revealed for the eavesdropping check
+    @param revealed_errors: number of revealed bits where Bob differs from Alice
+    @param eve_detected: True if the error rate exceeded the threshold (the block is then discarded)
+    @param secret_key: Bob's raw key without the revealed bits, reconciled when threshold > 0
+                       (None when the block is discarded)
+    @param alice_secret_key: Alice's raw key without the revealed bits (None when the block is discarded)
+    @param leaked_bits: parity bits disclosed by the reconciliation
+    @param corrected_bits: bits of Bob's key corrected by the reconciliation
+    """
+    index: int
+    qubits: int
+    sifted_bits: int
+    revealed_bits: int
+    revealed_errors: int
+    eve_detected: bool
+    secret_key: BitVector | None
+    alice_secret_key: BitVector | None = None
+    leaked_bits: int = 0
+    corrected_bits: int = 0
+
+    @property
+    def error_rate(self) -> float:
+        return self.revealed_errors / self.revealed_bits if self.revealed_bits else 0.0
+
+
+@dataclass
+class SessionStats:
+    """
+    Running statistics of a streaming session (updated by key_stream after every block)
+    """
+    blocks: int = 0
+    aborted_blocks: int = 0
+    qubits: int = 0
+    sifted_bits: int = 0
+    revealed_bits: int = 0
+    revealed_errors: int = 0
+    leaked_bits: int = 0
+    corrected_bits: int = 0
+    secret_bits: int = 0
+
+    def add(self, block: KeyBlock):
+        """Account for a finished block"""
+        self.blocks += 1
+        self.aborted_blocks += block.secret_key is None
+        self.qubits += block.qubits
+        self.sifted_bits += block.sifted_bits
+        self.revealed_bits += block.revealed_bits
+        self.revealed_errors += block.revealed_errors
+        self.leaked_bits += block.leaked_bits
+        self.corrected_bits += block.corrected_bits
+        if block.secret_key is not None:
+            self.secret_bits += len(block.secret_key)
+
+    @property
+    def qber(self) -> float:
+        """Quantum bit error rate estimated on all the revealed bits so far"""
+        return self.revealed_errors / self.revealed_bits if self.revealed_bits else 0.0
+
+    @property
+    def secret_rate(self) -> float:
+        """Secret key bits per qubit sent"""
+        return self.secret_bits / self.qubits if self.qubits else 0.0
+
+
+def run_block(block_size: int, eve_present: bool = False, backend: str = "numpy", reveal_fraction: float = 0.2,
+              threshold: float = 0.0, amplify: bool = False, rng: np.random.Generator | None = None,
+              index: int = 0) -> KeyBlock:
+    """
+    Run the BB84 protocol on one block of qubits
+    @param block_size: number of qubits sent by Alice
+    @param eve_present: if True, Eve intercepts and resends every qubit
+    @param backend: "numpy" (default) or "aer" (see bb84_challenge.BACKENDS)
+    @param reveal_fraction: fraction of the raw key revealed for the eavesdropping check
+    @param threshold: maximum accepted error rate on the revealed bits; when > 0 the accepted block is reconciled
+                      with Cascade (a block whose keys still differ afterwards is discarded)
+    @param amplify: if True, the secret key goes through privacy amplification (Toeplitz hashing)
+    @param rng: random generator for bits, bases, coin flips and revealed indices (default: fast_channel.rng)
+    @param index: block number, copied to the result
+    @return: KeyBlock
+    """
+    if backend not in bb84.BACKENDS:
+        raise ValueError(f"Unknown backend {backend!r}, expected one of {bb84.BACKENDS}")
+    rng = fast_channel.rng if rng is None else rng
+
+    # step 1) Alice's preparation
+    source = GeneratorBitSource(rng)
+    alice_bits = source.bits(block_size)
+    alice_bases = source.bits(block_size)
+    eve_bases = source.bits(block_size) if eve_present else None
+    bob_bases = source.bits(block_size)
+
+    # steps 2-3) (Eve) and Bob's measurement
+    if backend == "numpy":
+        qubits = fast_channel.prepare(alice_bits.packed, alice_bases.packed, block_size)
+        if eve_present:
+            qubits, _ = fast_channel.intercept(qubits, eve_bases.packed, rng)
+        bob_results = BitVector(fast_channel.measure(qubits, bob_bases.packed, rng), block_size)
+    else:
+        qubits = bb84.alice_prepare_qubits(alice_bits.to_str(), alice_bases.to_str())
+        if eve_present:
+            qubits, _ = bb84.eve_intercept_qubits(qubits, eve_bases.to_str(), batch_size=block_size, shots="adaptive")
+        bob_results = BitVector.from_str(bb84.bob_measure_qubits(qubits, bob_bases.to_str(), batch_size=block_size,
+                                                                 shots="adaptive"))
+
+    # step 4) sifting
+    mask = bb84.sift_mask(alice_bases, bob_bases)
+    alice_raw_key = alice_bits.compress(mask)
+    bob_raw_key = bob_results.compress(mask)
+
+    # steps 5-6) reveal a subset and detect Eve
+    sifted = len(bob_raw_key)
+    indices = np.sort(rng.choice(sifted, size=int(sifted * reveal_fraction), replace=False))
+    alice_subset = alice_raw_key.take(indices)
+    revealed_errors = (bob_raw_key.take(indices) ^ alice_subset).popcount()
+    eve_detected = len(indices) > 0 and revealed_errors / len(indices) > threshold
+
+    block = KeyBlock(index=index, qubits=block_size, sifted_bits=sifted, revealed_bits=len(indices),
+                     revealed_errors=revealed_errors, eve_detected=eve_detected, secret_key=None)
+    if eve_detected:
+        return block
+    bob_secret_key = bob_raw_key.delete(indices)
+    alice_secret_key = alice_raw_key.delete(indices)
+
+    # step 7) reconciliation of the accepted errors
+    if threshold > 0:
+        result = reconciliation.cascade(alice_secret_key, bob_secret_key, block.error_rate,
+                                        seed=int(rng.integers(2**32)))
+        block.leaked_bits, block.corrected_bits = result.leaked_bits, result.corrected_bits
+        if not result.keys_match:
+            return block
+        bob_secret_key = result.key
+
+    # step 8) privacy amplification (same public Toeplitz seed for Alice and Bob)
+    if amplify:
+        seed = int(rng.integers(2**32))
+        bob_secret_key = privacy_amplification.amplify(bob_secret_key, block.error_rate, block.leaked_bits, seed)
+        alice_secret_key = privacy_amplification.amplify(alice_secret_key, block.error_rate, block.leaked_bits, seed)
+
+    block.secret_key = bob_secret_key
+    block.alice_secret_key = alice_secret_key
+    return block
+
+
+def key_blocks(block_size: int = 1 << 16, blocks: int | None = None, stats: SessionStats | None = None,
+               **block_options) -> Iterator[KeyBlock]:
+    """
+    Run the protocol block after block and yield every KeyBlock (including the aborted ones)
+    @param block_size: number of qubits per block
+    @param blocks: number of blocks to run (None: run forever)
+    @param stats: SessionStats updated after each block
+    @param block_options: eve_present, backend, reveal_fraction, threshold, amplify, rng (see run_block)
+    """
+    for index in (itertools.count() if blocks is None else range(blocks)):
+        block = run_block(block_size, index=index, **block_options)
+        if stats is not None:
+            stats.add(block)
+        yield block
+
+
+def key_stream(block_size: int = 1 << 16, blocks: int | None = None, chunk_bits: int | None = None,
+               stats: SessionStats | None = None, abort_on_eve: bool = False, **block_options) -> Iterator[BitVector]:
+    """
+    Generate secret key material continuously
+    @param block_size: number of qubits per block
+    @param blocks: number of blocks to run (None: run forever)
+    @param chunk_bits: if set, the key is re-cut into chunks of exactly chunk_bits bits (the remainder of the last
+                       block is dropped when the stream ends); otherwise one chunk is yielded per accepted block
+    @param stats: SessionStats updated after each block
+    @param abort_on_eve: if True, raise ValueError on the first block where eavesdropping is detected
+                         (like bb84_protocol_eve_is_here); otherwise the block is discarded and the stream goes on
+    @param block_options: eve_present, backend, reveal_fraction, threshold, amplify, rng (see run_block)
+    @return: iterator of secret key chunks (Bob's side)
+    """
+    if chunk_bits is not None and chunk_bits < 1:
+        raise ValueError("chunk_bits must be >= 1")
+    pending = np.empty(0, dtype=np.uint8) # unpacked key bits not yet yielded (< chunk_bits + block_size)
+    for block in key_blocks(block_size, blocks, stats, **block_options):
+        if block.eve_detected and abort_on_eve:
+            raise ValueError(f"Eavesdropping detected in block {block.index} (error rate {block.error_rate:.3f})")
+        if block.secret_key is None:
+            continue
+        if chunk_bits is None:
+            yield block.secret_key
+            continue
+        pending = np.concatenate((pending, block.secret_key.unpack()))
+        full = len(pending) // chunk_bits
+        for i in range(full):
+            yield BitVector.from_bits(pending[i * chunk_bits:(i + 1) * chunk_bits])
+        pending = pending[full * chunk_bits:]
@@ -0,0 +1,267 @@
+"""
+Noisy BB84 channel: realistic channel noise mixed with (partial) eavesdropping, for QBER studies
+
+By default run_circuit uses an ideal AerSimulator, so every error Bob sees comes from Eve. Here the channel between
+the last sender (Alice, or Eve when she resends) and Bob can be:
+- depolarizing: with probability p the qubit is replaced by the maximally mixed state (Bob's bit flips w.p. p/2)
+- bit flip: an X error with probability p (flips standard-basis measurements only)
+- lossy: the photon is lost with probability p; Bob announces no detection and the qubit is dropped before sifting
+
+Eve intercepts each qubit with probability eve_probability (intercept-resend in a random basis).
+
+On Aer the depolarizing and bit-flip errors form a qiskit_aer NoiseModel attached to an "id" gate that stands
+for the fiber. A session never simulates one circuit per qubit: a single-qubit BB84 circuit only depends on
+(bit, preparation basis, measurement basis), so the at most 8 distinct circuits are run in ONE batched
+density-matrix job with as many shots as the largest group, and every qubit gets one of the shots of its group.
+Eve's measurements are a second batched job. A sweep over noise levels x eavesdropping probabilities therefore
+costs two small jobs per grid point. backend="numpy" gives the same statistics in closed form.
+
+shared_simulator builds the AerSimulator of each (noise, method) once; the sessions, the sweeps and the noise=
+option of bb84_challenge.bob_measure_qubits / run_circuits all reuse it.
+"""
+
+from __future__ import annotations
+
+import functools
+from dataclasses import dataclass
+
+import numpy as np
+
+import instrumentation
+
+METHODS = ("density_matrix", "stabilizer", "automatic") # Aer methods able to simulate Pauli channel noise
+
+
+@dataclass(frozen=True)
+class ChannelNoise:
+    """
+    Noise of the quantum channel between the last sender and Bob
+    @param depolarizing: depolarizing probability
+    @param bit_flip: X error probability
+    @param loss: photon loss probability
+    """
+    depolarizing: float = 0.0
+    bit_flip: float = 0.0
+    loss: float = 0.0
+
+    def __post_init__(self):
+        for name in ("depolarizing", "bit_flip", "loss"):
+            if not 0.0 <= getattr(self, name) <= 1.0:
+                raise ValueError(f"{name} must be a probability, got {getattr(self, name)}")
+
+    @property
+    def is_ideal(self) -> bool:
+        return self.depolarizing == 0.0 and self.bit_flip == 0.0
+
+
+@dataclass
+class NoisySessionResult:
+    """
+    Outcome of one noisy session
+    @param qubits: qubits sent by Alice
+    @param detected: qubits that reached Bob (not lost)
+    @param sifted_bits: detected qubits measured in Alice's basis
+    @param errors: sifted bits where Bob differs from Alice
+    """
+    qubits: int
+    detected: int
+    sifted_bits: int
+    errors: int
+
+    @property
+    def qber(self) -> float:
+        """Quantum bit error rate of the sifted key"""
+        return self.errors / self.sifted_bits if self.sifted_bits else 0.0
+
+
+# Aer:-----------------------------------------------------
+def noise_model(noise: ChannelNoise):
+    """
+    qiskit_aer NoiseModel of the channel: the depolarizing and bit-flip errors on the "id" (fiber) gate.
+    Loss is not a quantum error and is applied when sifting.
+    @param noise: ChannelNoise
+    @return: NoiseModel
+    """
+    from qiskit_aer.noise import NoiseModel, depolarizing_error, pauli_error
+
+    model = NoiseModel()
+    if not noise.is_ideal:
+        error = depolarizing_error(noise.depolarizing, 1).compose(
+            pauli_error([('X', noise.bit_flip), ('I', 1 - noise.bit_flip)]))
+        model.add_all_qubit_quantum_error(error, ['id'])
+    return model
+
+
+def noisy_simulator(noise: ChannelNoise, method: str = "density_matrix"):
+    """
+    AerSimulator with the channel noise model
+    @param noise: ChannelNoise
+    @param method: "density_matrix" (default, samples millions of shots in seconds), "stabilizer" or "automatic"
+    @return: AerSimulator
+    """
+    from qiskit_aer import AerSimulator
+
+    if method not in METHODS:
+        raise ValueError(f"Unknown method {method!r}, expected one of {METHODS}")
+    return AerSimulator(method=method, noise_model=noise_model(noise))
+
+
+@functools.lru_cache(maxsize=None)
+def shared_simulator(noise: ChannelNoise, method: str = "density_matrix"):
+    """
+    noisy_simulator(noise, method), built on the first call and then reused (one simulator per noise configuration)
+    @param noise: ChannelNoise (hashable: it is the cache key with method)
+    @param method: Aer method (see METHODS)
+    @return: AerSimulator
+    """
+    return noisy_simulator(noise, method)
+
+
+def _group_circuit(group: int, channel: bool):
+    """Circuit of a group: bit = bit 2, preparation basis = bit 1, measurement basis = bit 0 of group"""
+    from qiskit import QuantumCircuit
+
+    qc = QuantumCircuit(1)
+    if group >> 2 & 1:
+        qc.x(0)
+    if group >> 1 & 1:
+        qc.h(0)
+    if channel:
+        qc.id(0) # the fiber: the channel noise is attached to this gate
+    if group & 1:
+        qc.h(0)
+    qc.measure_all()
+    return qc
+
+
+def sample_outcomes(simulator, bits: np.ndarray, prep_bases: np.ndarray, meas_bases: np.ndarray,
+                    rng: np.random.Generator, channel: bool = True) -> np.ndarray:
+    """
+    Measurement outcomes of many single-qubit BB84 circuits with ONE simulator job.
+    The qubits are grouped by (bit, preparation basis, measurement basis); each distinct circuit runs with as many
+    shots as the largest group and every qubit receives a different shot of its group (shots are independent).
+    @param simulator: AerSimulator (noisy or not)
+    @param bits: unpacked 0/1 array of the prepared bits
+    @param prep_bases: unpacked 0/1 array of the preparation bases
+    @param meas_bases: unpacked 0/1 array of the measurement bases
+    @param rng: generator used to assign the shots to the qubits
+    @param channel: include the fiber ("id") gate carrying the channel noise
+    @return: unpacked 0/1 array of outcomes
+    """
+    from qiskit import transpile
+
+    groups = (bits.astype(np.uint8) << 2) | (prep_bases.astype(np.uint8) << 1) | meas_bases.astype(np.uint8)
+    sizes = np.bincount(groups, minlength=8)
+    present = np.flatnonzero(sizes)
+    outcomes = np.empty(groups.size, dtype=np.uint8)
+    if present.size == 0:
+        return outcomes
+
+    circuits = transpile([_group_circuit(int(g), channel) for g in present], simulator, optimization_level=0)
+    shots = int(sizes.max())
+    result = simulator.run(circuits, shots=shots).result()
+    instrumentation.simulator_stats["jobs"] += 1
+    instrumentation.simulator_stats["shots"] += shots * len(circuits)
+
+    for i, group in enumerate(present):
+        samples = np.zeros(shots, dtype=np.uint8)
+        samples[:result.get_counts(i).get('1', 0)] = 1
+        rng.shuffle(samples)
+        outcomes[groups == group] = samples[:sizes[group]]
+    return outcomes
+
+
+# Closed form (numpy):-------------------------------------
+def _closed_form_outcomes(bits: np.ndarray, prep_bases: np.ndarray, meas_bases: np.ndarray,
+                          rng: np.random.Generator, noise: ChannelNoise | None) -> np.ndarray:
+    """Same statistics as sample_outcomes without a simulator"""
+    n = bits.size
+    outcomes = np.where(prep_bases == meas_bases, bits, rng.integers(0, 2, n, dtype=np.uint8)).astype(np.uint8)
+    if noise is not None and not noise.is_ideal:
+        # an X error flips standard-basis results; depolarizing flips any result w.p. p/2
+        same_basis = prep_bases == meas_bases
+        flip = (rng.random(n) < noise.bit_flip) & (meas_bases == 0) & same_basis
+        flip ^= (rng.random(n) < noise.depolarizing / 2) & same_basis # mismatched bases stay a fair coin
+        outcomes ^= flip.astype(np.uint8)
+    return outcomes
+
+
+# Sessions:------------------------------------------------
+def run_noisy_session(numqubits: int, noise: ChannelNoise = ChannelNoise(), eve_probability: float = 0.0,
+                      backend: str = "aer", method: str = "density_matrix", rng: np.random.Generator | None = None,
+                      simulator=None) -> NoisySessionResult:
+    """
+    Run a whole session through the noisy channel and measure its QBER
+    @param numqubits: qubits sent by Alice
+    @param noise: ChannelNoise between the last sender and Bob
+    @param eve_probability: probability that Eve intercepts and resends a qubit
+    @param backend: "aer" (batched density-matrix / stabilizer jobs) or "numpy" (closed form)
+    @param method: Aer method (see METHODS)
+    @param rng: random generator (default: a new generator seeded with 84)
+    @param simulator: AerSimulator to use for Bob (default: shared_simulator(noise, method))
+    @return: NoisySessionResult
+    """
+    if backend not in ("aer", "numpy"):
+        raise ValueError(f"Unknown backend {backend!r}, expected 'aer' or 'numpy'")
+    if not 0.0 <= eve_probability <= 1.0:
+        raise ValueError("eve_probability must be a probability")
+    rng = np.random.default_rng(84) if rng is None else rng
+
+    alice_bits = rng.integers(0, 2, numqubits, dtype=np.uint8)
+    alice_bases = rng.integers(0, 2, numqubits, dtype=np.uint8)
+    bob_bases = rng.integers(0, 2, numqubits, dtype=np.uint8)
+    intercepted = rng.random(numqubits) < eve_probability
+    eve_bases = rng.integers(0, 2, numqubits, dtype=np.uint8)
+
+    # Eve (next to Alice, no channel noise yet) measures and resends the intercepted qubits
+    sent_bits, sent_bases = alice_bits.copy(), alice_bases.copy()
+    if intercepted.any():
+        if backend == "aer":
+            eve_results = sample_outcomes(shared_simulator(ChannelNoise(), method), alice_bits[intercepted],
+                                          alice_bases[intercepted], eve_bases[intercepted], rng, channel=False)
+        else:
+            eve_results = _closed_form_outcomes(alice_bits[intercepted], alice_bases[intercepted],
+                                                eve_bases[intercepted], rng, None)
+        sent_bits[intercepted] = eve_results
+        sent_bases[intercepted] = eve_bases[intercepted]
+
+    # the channel to Bob: loss, then noise and Bob's measurement
+    detected = rng.random(numqubits) >= noise.loss
+    if backend == "aer":
+        simulator = shared_simulator(noise, method) if simulator is None else simulator
+        bob_results = sample_outcomes(simulator, sent_bits[detected], sent_bases[detected], bob_bases[detected], rng)
+    else:
+        bob_results = _closed_form_outcomes(sent_bits[detected], sent_bases[detected], bob_bases[detected], rng,
+                                            noise)
+
+    sifted = alice_bases[detected] == bob_bases[detected]
+    errors = int(np.count_nonzero(bob_results[sifted] != alice_bits[detected][sifted]))
+    return NoisySessionResult(qubits=numqubits, detected=int(detected.sum()), sifted_bits=int(sifted.sum()),
+                              errors=errors)
+
+
+def qber_sweep(noise_levels: list[float], eve_probabilities: list[float], numqubits: int = 10**5,
+               bit_flip: float = 0.0, loss: float = 0.0, backend: str = "aer", method: str = "density_matrix",
+               seed: int = 84) -> list[dict]:
+    """
+    QBER over a grid of depolarizing noise levels x eavesdropping probabilities
+    @param noise_levels: depolarizing probabilities
+    @param eve_probabilities: interception probabilities
+    @param numqubits: qubits per grid point
+    @param bit_flip: X error probability (same for the whole grid)
+    @param loss: loss probability (same for the whole grid)
+    @param backend: "aer" or "numpy"
+    @param method: Aer method (see METHODS)
+    @param seed: root seed, every grid point gets its own derived stream
+    @return: list of rows {depolarizing, eve_probability, qber, sifted_bits, detected}
+    """
+    seeds = iter(np.random.SeedSequence(seed).spawn(len(noise_levels) * len(eve_probabilities)))
+    rows = []
+    for level in noise_levels:
+        noise = ChannelNoise(depolarizing=level, bit_flip=bit_flip, loss=loss)
+        for eve_probability in eve_probabilities: # the sessions of a noise level share its simulator
+            result = run_noisy_session(numqubits, noise, eve_probability, backend=backend, method=method,
+                                       rng=np.random.default_rng(next(seeds)))
+            rows.append({"depolarizing": level, "eve_probability": eve_probability, "qber": result.qber,
+                         "sifted_bits": result.sifted_bits, "detected": result.detected})
+    return rows
@@ -0,0 +1,102 @@
+"""
+Memoized outcome distributions of BB84 circuits
+
+On an ideal simulator a BB84 circuit only depends on (bit, encoding basis, measurement basis): its outcome is
+either deterministic or a fair coin flip, yet bob_measure_qubits and eve_intercept_qubits simulate every qubit
+again. With the cache enabled (bb84_challenge.enable_outcome_cache), run_circuits looks every circuit up by its
+structure (bb84_challenge.circuit_key):
+
+- miss: the distribution of the circuit is computed once and stored. On the ideal simulator small circuits get
+  their exact probabilities from the statevector (no shots); on a noisy simulator they are simulated once with
+  warmup_shots shots and their frequencies are stored. Circuits wider than EXACT_MAX_QUBITS (qubit_registers)
+  are simulated with the requested shots and never stored: their structure does not repeat
+- hit: the requested shots are drawn from the stored distribution with the cache's own generator, no simulator job
+
+Exact probabilities matter for BB84: with MAJORITY_SHOTS shots the most frequent outcome amplifies any bias of an
+estimated coin flip (p = 0.505 already gives the same majority 63 % of the time), while the exact 0.5 keeps Bob's
+results fair. After warm-up (the 8 single-qubit circuits of BB84) a session runs without any simulator call, and
+a fixed seed makes repeated teaching runs and regression tests reproducible. The cache holds at most maxsize
+distributions and evicts the least recently used one. It is opt-in: the samples are statistically, not shot for
+shot, equivalent to a simulation.
+"""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from collections.abc import Hashable
+
+import numpy as np
+
+CACHE_SIZE = 256
+WARMUP_SHOTS = 8192 # shots of the simulation that fills an entry without exact probabilities
+EXACT_MAX_QUBITS = 12 # widest circuit whose exact distribution is computed from its statevector
+
+
+class OutcomeCache:
+    """
+    LRU cache of {outcome: probability} distributions, keyed by circuit structure
+    @param maxsize: maximum number of distributions kept
+    @param warmup_shots: shots used to simulate a missing circuit that has no exact distribution
+    @param seed: seed of the generator drawing the samples
+    """
+
+    def __init__(self, maxsize: int = CACHE_SIZE, warmup_shots: int = WARMUP_SHOTS, seed: int = 84):
+        if maxsize < 1 or warmup_shots < 1:
+            raise ValueError("maxsize and warmup_shots must be >= 1")
+        self.maxsize = maxsize
+        self.warmup_shots = warmup_shots
+        self.rng = np.random.default_rng(seed)
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Hashable, tuple[list[str], np.ndarray]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def put(self, key: Hashable, counts: dict):
+        """
+        Store the distribution of a circuit (evicting the least recently used entry when full)
+        @param key: circuit_key of the circuit
+        @param counts: its counts {outcome: number of shots} or probabilities {outcome: probability}
+        """
+        outcomes = list(counts)
+        frequencies = np.fromiter(counts.values(), dtype=np.float64, count=len(outcomes))
+        self._entries[key] = (outcomes, frequencies / frequencies.sum())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def sample(self, key: Hashable, shots: int) -> dict | None:
+        """
+        Draw counts from a stored distribution
+        @param key: circuit_key of the circuit
+        @param shots: number of shots
+        @return: {outcome: count}, or None if the key is not cached
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return self.draw(key, shots)
+
+    def draw(self, key: Hashable, shots: int) -> dict:
+        """
+        Draw counts from a stored distribution without counting a hit (e.g. an entry put after a missed sample)
+        @param key: circuit_key of a cached circuit
+        @param shots: number of shots
+        @return: {outcome: count}
+        """
+        self._entries.move_to_end(key)
+        outcomes, probabilities = self._entries[key]
+        drawn = self.rng.multinomial(shots, probabilities)
+        return {outcome: int(count) for outcome, count in zip(outcomes, drawn) if count}
+
+    def clear(self):
+        """Drop every distribution and reset the hit/miss counters"""
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
@@ -0,0 +1,191 @@
+"""
+Parallel multi-session BB84 runner (Monte Carlo QBER studies)
+
+bb84_challenge draws every random choice from the global random module seeded once with random.seed(84), so
+sessions can only run one after another. Here every session gets its own reproducible stream, derived from a
+root seed and the session number with numpy.random.SeedSequence.spawn, and the sessions are fanned out over a
+concurrent.futures.ProcessPoolExecutor:
+
+    summary = run_sessions(1000, numqubits=10_000, eve_present=True, workers=8)
+    print(summary.detection_rate, summary.mean_error_rate)
+
+Session i always uses the i-th spawned stream and the results are returned in session order, so the results do
+not depend on the number of workers (bit for bit with the "numpy" backend; the "aer" backend draws its coin
+flips inside the simulator and is only reproducible statistically).
+"""
+
+from __future__ import annotations
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+
+import numpy as np
+
+import key_stream
+
+
+@dataclass
+class SessionResult:
+    """
+    Outcome of one BB84 session (see key_stream.KeyBlock for the fields)
+    """
+    session: int
+    qubits: int
+    sifted_bits: int
+    revealed_bits: int
+    revealed_errors: int
+    eve_detected: bool
+    secret_bits: int
+
+    @property
+    def error_rate(self) -> float:
+        return self.revealed_errors / self.revealed_bits if self.revealed_bits else 0.0
+
+
+@dataclass
+class SessionSummary:
+    """
+    Aggregate of many sessions, in session order
+    """
+    results: list[SessionResult] = field(default_factory=list)
+
+    @property
+    def sessions(self) -> int:
+        return len(self.results)
+
+    @property
+    def key_lengths(self) -> np.ndarray:
+        """Secret key length of every session (0 when the session was aborted)"""
+        return np.array([r.secret_bits for r in self.results], dtype=np.int64)
+
+    @property
+    def error_rates(self) -> np.ndarray:
+        """Error rate measured on the revealed bits of every session"""
+        return np.array([r.error_rate for r in self.results], dtype=np.float64)
+
+    @property
+    def detection_rate(self) -> float:
+        """Fraction of the sessions where eavesdropping was detected"""
+        return float(np.mean([r.eve_detected for r in self.results])) if self.results else 0.0
+
+    @property
+    def mean_error_rate(self) -> float:
+        return float(self.error_rates.mean()) if self.results else 0.0
+
+    @property
+    def mean_key_length(self) -> float:
+        return float(self.key_lengths.mean()) if self.results else 0.0
+
+    def as_dict(self) -> dict:
+        """Summary statistics as plain Python values (e.g. for json.dump)"""
+        return {
+            "sessions": self.sessions,
+            "detection_rate": self.detection_rate,
+            "mean_error_rate": self.mean_error_rate,
+            "std_error_rate": float(self.error_rates.std()) if self.results else 0.0,
+            "mean_key_length": self.mean_key_length,
+            "total_secret_bits": int(self.key_lengths.sum()),
+        }
+
+
+def session_seeds(seed: int, sessions: int) -> list[np.random.SeedSequence]:
+    """
+    Independent, reproducible seed sequences, one per session
+    @param seed: root seed
+    @param sessions: number of sessions
+    @return: list of SeedSequence (the i-th one only depends on seed and i)
+    """
+    return np.random.SeedSequence(seed).spawn(sessions)
+
+
+def run_block(index: int, seed_sequence: np.random.SeedSequence, block_size: int,
+              block_options: dict) -> key_stream.KeyBlock:
+    """
+    Run one block with its own random stream (executed in the worker processes). A session of run_sessions is one
+    block; bb84_cli cuts a long session into blocks (run_blocks)
+    @param index: block (session) number
+    @param seed_sequence: the block's seed sequence (see session_seeds)
+    @param block_size: number of qubits sent by Alice
+    @param block_options: eve_present, backend, reveal_fraction, threshold, amplify (see key_stream.run_block)
+    @return: KeyBlock (alice_secret_key dropped, it never leaves Alice)
+    """
+    block = key_stream.run_block(block_size, rng=np.random.default_rng(seed_sequence), index=index, **block_options)
+    block.alice_secret_key = None
+    return block
+
+
+def run_blocks(block_sizes: list[int], seed: int = 84, workers: int | None = None, chunksize: int | None = None,
+               **block_options) -> list[key_stream.KeyBlock]:
+    """
+    Run blocks over a process pool, block i with the i-th stream spawned from seed
+    @param block_sizes: number of qubits of every block
+    @param seed: root seed of the block streams
+    @param workers: number of worker processes (see parallel_map)
+    @param chunksize: blocks sent to a worker at once (see parallel_map)
+    @param block_options: eve_present, backend, reveal_fraction, threshold, amplify (see key_stream.run_block)
+    @return: KeyBlocks in block order (see run_block)
+    """
+    if "rng" in block_options:
+        raise ValueError("the block streams are derived from seed, rng cannot be given")
+    seeds = session_seeds(seed, len(block_sizes))
+    return parallel_map(run_block, range(len(block_sizes)), seeds, block_sizes, [block_options] * len(block_sizes),
+                        workers=workers, chunksize=chunksize)
+
+
+def run_session(session: int, seed_sequence: np.random.SeedSequence, numqubits: int,
+                block_options: dict) -> SessionResult:
+    """
+    Run one session with its own random stream (executed in the worker processes)
+    @param session: session number
+    @param seed_sequence: the session's seed sequence
+    @param numqubits: number of qubits sent by Alice
+    @param block_options: eve_present, backend, reveal_fraction, threshold (see key_stream.run_block)
+    @return: SessionResult
+    """
+    block = run_block(session, seed_sequence, numqubits, block_options)
+    return SessionResult(session=session, qubits=block.qubits, sifted_bits=block.sifted_bits,
+                         revealed_bits=block.revealed_bits, revealed_errors=block.revealed_errors,
+                         eve_detected=block.eve_detected,
+                         secret_bits=0 if block.secret_key is None else len(block.secret_key))
+
+
+def run_sessions(sessions: int, numqubits: int = 100, seed: int = 84, workers: int | None = None,
+                 chunksize: int | None = None, **block_options) -> SessionSummary:
+    """
+    Run independent BB84 sessions over a process pool and aggregate them
+    @param sessions: number of sessions
+    @param numqubits: number of qubits per session
+    @param seed: root seed of the session streams
+    @param workers: number of worker processes (None: os.cpu_count(), 1: run in this process without a pool)
+    @param chunksize: sessions sent to a worker at once (default: about 4 chunks per worker)
+    @param block_options: eve_present, backend, reveal_fraction, threshold (see key_stream.run_block)
+    @return: SessionSummary with the results in session order
+    """
+    if "rng" in block_options:
+        raise ValueError("the session streams are derived from seed, rng cannot be given")
+    seeds = session_seeds(seed, sessions)
+    return SessionSummary(parallel_map(run_session, range(sessions), seeds, [numqubits] * sessions,
+                                       [block_options] * sessions, workers=workers, chunksize=chunksize))
+
+
+def parallel_map(func, *iterables, workers: int | None = None, chunksize: int | None = None) -> list:
+    """
+    map(func, *iterables) over a process pool, results in input order (also used by eve_attacks)
+    @param func: module-level function (picklable)
+    @param iterables: argument sequences, same length
+    @param workers: number of worker processes (None: os.cpu_count(), 1: run in this process without a pool)
+    @param chunksize: calls sent to a worker at once (default: about 4 chunks per worker)
+    @return: list of results
+    """
+    workers = (os.cpu_count() or 1) if workers is None else workers
+    if workers < 1:
+        raise ValueError("workers must be >= 1")
+    args = [list(iterable) for iterable in iterables]
+    calls = len(args[0]) if args else 0
+    if workers == 1 or calls <= 1:
+        return list(map(func, *args))
+
+    chunksize = max(1, calls // (workers * 4)) if chunksize is None else chunksize
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(func, *args, chunksize=chunksize))
@@ -0,0 +1,91 @@
+"""
+Privacy amplification of the reconciled BB84 key (Toeplitz hashing)
+
+After sifting, detection and reconciliation Alice and Bob share the same key, but Eve may know part of it:
+from her measurements (about n * h(QBER) bits, h the binary entropy) and from the parities disclosed by the
+reconciliation (leaked_bits). Privacy amplification compresses the n-bit key into m bits,
+
+    m = n - n * h(QBER) - leaked_bits - 2 * security_bits
+
+with a hash chosen at random (publicly) from a universal family: here the Toeplitz matrices. An m x n Toeplitz
+matrix is defined by m + n - 1 random bits t, and T x is a slice of the convolution t * x (mod 2), computed with
+an FFT in O(n log n) instead of the O(n m) matrix product, so megabit keys are amplified in milliseconds.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+
+from bitvector import BitVector
+
+SECURITY_BITS = 20 # the amplified key is 2^-SECURITY_BITS close to a key unknown to Eve
+
+
+def binary_entropy(p: float) -> float:
+    """
+    Binary entropy h(p) = -p log2(p) - (1 - p) log2(1 - p)
+    @param p: probability
+    @return: entropy in bits
+    """
+    if p <= 0.0 or p >= 1.0:
+        return 0.0
+    return float(-p * np.log2(p) - (1 - p) * np.log2(1 - p))
+
+
+def final_key_length(key_length: int, qber: float, leaked_bits: int, security_bits: int = SECURITY_BITS) -> int:
+    """
+    Length of the amplified key
+    @param key_length: length of the reconciled key
+    @param qber: estimated quantum bit error rate
+    @param leaked_bits: bits disclosed by the reconciliation
+    @param security_bits: security parameter (log2 of 1 / epsilon)
+    @return: number of secret bits that can be extracted (0 when nothing can)
+    """
+    length = key_length - key_length * binary_entropy(qber) - leaked_bits - 2 * security_bits
+    return max(0, int(np.floor(length)))
+
+
+def toeplitz_hash(key: BitVector, output_length: int, seed_bits: BitVector) -> BitVector:
+    """
+    Multiply the key by the Toeplitz matrix T[i, j] = t[i - j + n - 1] over GF(2), with an FFT convolution
+    @param key: the n-bit key x
+    @param output_length: m, number of output bits
+    @param seed_bits: the m + n - 1 bits t defining the matrix
+    @return: T x (m bits)
+    """
+    n = len(key)
+    if output_length < 0 or output_length > n:
+        raise ValueError("output_length must be between 0 and the key length")
+    if len(seed_bits) != output_length + n - 1:
+        raise ValueError("a Toeplitz hash of n bits to m bits needs m + n - 1 seed bits")
+    if output_length == 0:
+        return BitVector.zeros(0)
+
+    x = key.unpack().astype(np.float64)
+    t = seed_bits.unpack().astype(np.float64)
+    # A circular convolution of size >= m + n - 1 is enough: the terms that wrap around only land before index n - 1
+    size = 1 << (len(t) - 1).bit_length() # power of two >= m + n - 1
+    convolution = np.fft.irfft(np.fft.rfft(t, size) * np.fft.rfft(x, size), size)
+    # (T x)_i = sum_j t[i - j + n - 1] x_j = convolution[i + n - 1]; the sums are integers <= n, round them
+    counts = np.rint(convolution[n - 1:n - 1 + output_length]).astype(np.int64)
+    return BitVector.from_bits((counts & 1).astype(np.uint8))
+
+
+def amplify(key: BitVector, qber: float, leaked_bits: int, seed: int,
+            security_bits: int = SECURITY_BITS) -> BitVector:
+    """
+    Compress the reconciled key into the final secret key
+    @param key: reconciled key (identical for Alice and Bob)
+    @param qber: estimated quantum bit error rate
+    @param leaked_bits: bits disclosed by the reconciliation
+    @param seed: public seed of the Toeplitz matrix (agreed by Alice and Bob, may be known to Eve)
+    @param security_bits: security parameter (see final_key_length)
+    @return: the final key (possibly empty)
+    """
+    output_length = final_key_length(len(key), qber, leaked_bits, security_bits)
+    if output_length == 0: # nothing left to extract (also an empty key: no Toeplitz seed to draw)
+        return BitVector.zeros(0)
+    rng = np.random.default_rng(seed)
+    seed_length = output_length + len(key) - 1
+    seed_bits = BitVector(rng.integers(0, 256, (seed_length + 7) // 8, dtype=np.uint8), seed_length)
+    return toeplitz_hash(key, output_length, seed_bits)
@@ -0,0 +1,120 @@
+"""
+Multi-qubit register encoding of the BB84 qubits
+
+alice_prepare_qubits builds one single-qubit QuantumCircuit per qubit: the number of circuits (and the Python
+overhead of building, transpiling and reading them) grows with the key length. The qubits of BB84 never interact,
+so they can share circuits: QubitRegisters puts register_size qubits side by side in each circuit (qubit i of the
+session is qubit i % register_size of circuit i // register_size).
+
+- Alice prepares each register with x / h gates on its qubits
+- Eve and Bob apply their basis rotations (h) in place on the registers and measure all the qubits at once
+- the measured bitstrings are split back into one result per qubit (marginal readout: the most frequent value of
+  each qubit over the shots, a majority vote per qubit when shots > 1)
+
+The circuits only contain Clifford gates, so AerSimulator's automatic method picks the stabilizer simulator and
+registers of hundreds of qubits are cheap (a statevector simulation would be limited to about 20-30 qubits).
+bb84_challenge uses this representation when alice_prepare_qubits is called with register_size; Eve and Bob
+accept it in place of the list, like fast_channel.PackedQubits.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from qiskit import QuantumCircuit
+
+REGISTER_SIZE = 100 # default number of qubits per circuit (stabilizer simulation)
+
+
+class QubitRegisters:
+    """
+    Qubits travelling on the channel, register_size qubits per circuit
+    @param circuits: list of QuantumCircuit (the last one may hold fewer qubits)
+    @param length: total number of qubits
+    @param register_size: qubits per circuit
+    measured is set by rotate_and_measure, which modifies the circuits in place: like real qubits, the registers
+    can only be measured once (prepare new registers, as Eve does, to measure again)
+    """
+
+    def __init__(self, circuits: list[QuantumCircuit], length: int, register_size: int):
+        if len(circuits) != -(-length // register_size):
+            raise ValueError("the number of circuits does not match length and register_size")
+        self.circuits = circuits
+        self.length = length
+        self.register_size = register_size
+        self.measured = False
+
+    def __len__(self) -> int:
+        return self.length
+
+    def slices(self, bits: str) -> list[str]:
+        """Cut a string of one character per qubit into one string per register"""
+        return [bits[start:start + self.register_size] for start in range(0, self.length, self.register_size)]
+
+
+def prepare(alice_bits: str, alice_bases: str, register_size: int = REGISTER_SIZE) -> QubitRegisters:
+    """
+    Alice prepares the qubits in registers (same encoding as alice_prepare_qubits)
+    @param alice_bits: string of bits
+    @param alice_bases: string of bases
+    @param register_size: qubits per circuit
+    @return: QubitRegisters
+    """
+    from qiskit import QuantumCircuit
+
+    if len(alice_bits) != len(alice_bases):
+        raise ValueError("alice_bits and alice_bases must have the same length")
+    if register_size < 1:
+        raise ValueError("register_size must be >= 1")
+    circuits = []
+    for start in range(0, len(alice_bits), register_size):
+        bits, bases = alice_bits[start:start + register_size], alice_bases[start:start + register_size]
+        qc = QuantumCircuit(len(bits))
+        ones = [q for q, bit in enumerate(bits) if bit == '1']
+        diagonal = [q for q, base in enumerate(bases) if base == '1']
+        if ones:
+            qc.x(ones) # |0> -> |1>
+        if diagonal:
+            qc.h(diagonal) # |0> -> |+> and |1> -> |->
+        circuits.append(qc)
+    return QubitRegisters(circuits, len(alice_bits), register_size)
+
+
+def rotate_and_measure(registers: QubitRegisters, bases: str, channel: bool = False) -> list[QuantumCircuit]:
+    """
+    Apply the basis rotations in place and measure every qubit (the registers are consumed, like measured qubits)
+    @param registers: the qubits to measure
+    @param bases: string of bases, one per qubit
+    @param channel: add the fiber ("id") gates carrying the channel noise before the rotations (see noisy_channel)
+    @return: the measurement circuits (the circuits of registers, modified)
+    @raise ValueError: if the registers were already measured
+    """
+    if registers.measured:
+        raise ValueError("the registers were already measured: their circuits end with a measurement")
+    if len(bases) != registers.length:
+        raise ValueError("the number of bases must match the number of qubits")
+    registers.measured = True
+    for qc, register_bases in zip(registers.circuits, registers.slices(bases)):
+        if channel:
+            qc.id(range(qc.num_qubits)) # the fiber between the sender and Bob
+        diagonal = [q for q, base in enumerate(register_bases) if base == '1']
+        if diagonal:
+            qc.h(diagonal) # |+> -> |0> and |-> -> |1>
+        qc.measure_all()
+    return registers.circuits
+
+
+def marginal_bits(counts: dict, num_qubits: int) -> str:
+    """
+    Per-qubit readout of the counts of one register
+    @param counts: {bitstring: count} of a circuit measured with measure_all (qubit 0 is the rightmost character)
+    @param num_qubits: number of qubits of the register
+    @return: string of num_qubits bits, qubit 0 first: the most frequent value of each qubit
+    """
+    outcomes = np.frombuffer(''.join(counts).encode('ascii'), dtype=np.uint8).reshape(len(counts), num_qubits)
+    weights = np.fromiter(counts.values(), dtype=np.int64, count=len(counts))
+    ones = weights @ (outcomes[:, ::-1] - ord('0')) # number of shots where each qubit measured 1
+    return ((ones * 2 > weights.sum()).astype(np.uint8) + ord('0')).tobytes().decode('ascii')
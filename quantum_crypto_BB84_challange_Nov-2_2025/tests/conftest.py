@@ -0,0 +1,8 @@
+"""
+The modules of the challenge are imported as top-level modules (import bitvector, import bb84_challenge...)
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,113 @@
+import pytest
+
+import bb84_challenge as bb84
+
+
+@pytest.mark.parametrize("key, indices, expected", [
+    ("0101", [], "0101"),
+    ("0101", [0, 2], "11"),
+    ("0101", [1, 1, 3], "00"),
+    ("0101", [10], "0101"), # out of range: ignored
+    ("0101", [-1], "0101"), # negative: ignored, not counted from the end
+    ("ab01", [0], "b01"), # any characters
+    ("", [0], ""),
+])
+def test_remove_revealed_key(key, indices, expected):
+    assert bb84.remove_revealed_key(key, indices) == expected
+
+
+def test_remove_revealed_key_matches_reveal_key_subset():
+    key = bb84.generate_random_binary_string(500)
+    subset, indices = bb84.reveal_key_subset(key, 0.2)
+    revealed = set(indices)
+    assert bb84.remove_revealed_key(key, indices) == ''.join(b for i, b in enumerate(key) if i not in revealed)
+    assert subset == ''.join(key[i] for i in indices)
+
+
+def rz_circuit(angle: float):
+    from qiskit import QuantumCircuit
+
+    qc = QuantumCircuit(1)
+    qc.rz(angle, 0)
+    qc.measure_all()
+    return qc
+
+
+@pytest.fixture
+def small_transpile_cache(monkeypatch):
+    monkeypatch.setattr(bb84, "TRANSPILE_CACHE_SIZE", 4)
+    bb84.clear_transpile_cache()
+    yield
+    bb84.clear_transpile_cache()
+
+
+def test_transpile_cache_keeps_the_hits_of_a_full_cache(small_transpile_cache):
+    bb84.transpile_cached([rz_circuit(angle) for angle in range(4)])
+    transpiled = bb84.transpile_cached([rz_circuit(0), rz_circuit(99)]) # the hit would be the oldest entry
+    assert len(transpiled) == 2
+    assert list(bb84._transpile_cache)[-2:] == [bb84.circuit_key(rz_circuit(0)), bb84.circuit_key(rz_circuit(99))]
+    assert len(bb84._transpile_cache) == 4
+
+
+def test_transpile_cache_with_more_misses_than_entries(small_transpile_cache):
+    circuits = [rz_circuit(angle) for angle in range(10)]
+    transpiled = bb84.transpile_cached(circuits)
+    assert len(transpiled) == 10 and len(bb84._transpile_cache) == 4
+    assert all(qc is not circ for qc, circ in zip(transpiled, circuits)) # every circuit went through transpile()
+
+
+def test_one_simulator_per_noise_configuration():
+    from noisy_channel import ChannelNoise, shared_simulator
+
+    noise = ChannelNoise(depolarizing=0.2)
+    assert bb84.get_simulator(noise) is bb84.get_simulator(ChannelNoise(depolarizing=0.2))
+    assert bb84.get_simulator(noise) is not bb84.get_simulator(ChannelNoise(bit_flip=0.2))
+    assert bb84.get_simulator(ChannelNoise()) is bb84.get_simulator() # an ideal channel is the shared simulator
+    assert shared_simulator(ChannelNoise(), "stabilizer") is shared_simulator(ChannelNoise(), "stabilizer")
+
+
+@pytest.mark.parametrize("register_size", [None, 100])
+def test_bob_measures_through_a_noisy_channel(register_size):
+    from noisy_channel import ChannelNoise
+
+    bits = bb84.generate_random_binary_string(2000)
+    bases = bb84.generate_random_binary_string(2000)
+    qubits = bb84.alice_prepare_qubits(bits, bases, register_size=register_size)
+    measured = bb84.bob_measure_qubits(qubits, bases, batch_size=100, shots=1, noise=ChannelNoise(depolarizing=0.4))
+    errors = sum(m != b for m, b in zip(measured, bits)) / len(bits)
+    assert 0.15 < errors < 0.25 # depolarizing p flips a matching-basis result with probability p/2
+    qubits = bb84.alice_prepare_qubits(bits, bases, register_size=register_size)
+    assert bb84.bob_measure_qubits(qubits, bases, batch_size=100, shots=1, noise=ChannelNoise()) == bits
+
+
+def test_noise_the_channel_cannot_simulate():
+    from noisy_channel import ChannelNoise
+
+    qubits = bb84.alice_prepare_qubits("01", "01")
+    with pytest.raises(ValueError):
+        bb84.bob_measure_qubits(qubits, "01", noise=ChannelNoise(loss=0.1))
+    with pytest.raises(ValueError):
+        bb84.bob_measure_qubits(bb84.alice_prepare_qubits("01", "01", backend="numpy"), "01",
+                                noise=ChannelNoise(depolarizing=0.1))
+
+
+def test_adaptive_shots_follow_the_channel():
+    from noisy_channel import ChannelNoise
+
+    assert bb84.resolve_shots("adaptive") == 1
+    assert bb84.resolve_shots("adaptive", ChannelNoise()) == 1
+    assert bb84.resolve_shots("adaptive", ChannelNoise(depolarizing=0.1)) == bb84.MAJORITY_SHOTS
+    assert bb84.resolve_shots(7, ChannelNoise(depolarizing=0.1)) == 7
+    for shots in (0, "majority", 1.5):
+        with pytest.raises(ValueError):
+            bb84.resolve_shots(shots)
+
+
+def test_adaptive_majority_vote_corrects_a_noisy_channel():
+    from noisy_channel import ChannelNoise
+
+    bits = bb84.generate_random_binary_string(40)
+    bases = bb84.generate_random_binary_string(40)
+    noise = ChannelNoise(depolarizing=0.3) # each shot flips with probability 0.15: the majority of 1001 never does
+    qubits = bb84.alice_prepare_qubits(bits, bases)
+    assert bb84.bob_measure_qubits(qubits, bases, batch_size=40, shots="adaptive", noise=noise) == bits
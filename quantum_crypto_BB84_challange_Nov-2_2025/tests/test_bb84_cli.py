@@ -0,0 +1,15 @@
+import json
+
+import bb84_cli
+
+
+def test_cli_key_does_not_depend_on_the_workers(tmp_path):
+    keys = []
+    for workers in ("1", "2", "3"):
+        output = tmp_path / f"key{workers}.json"
+        assert bb84_cli.main(["--qubits", "5000", "--block-size", "700", "--amplify", "--seed", "7",
+                              "--workers", workers, "--output", str(output)]) == 0
+        report = json.loads(output.read_text())
+        keys.append((report["key_bits"], report["key"], report["blocks"]))
+    assert keys[0][0] > 0
+    assert keys[0] == keys[1] == keys[2]
@@ -0,0 +1,43 @@
+import random
+
+import numpy as np
+import pytest
+
+import bit_source
+from bit_source import GeneratorBitSource, LegacyBitSource, SystemBitSource
+
+
+@pytest.mark.parametrize("length", [0, 1, 7, 8, 100, 1001])
+def test_legacy_source_matches_random_choices(length):
+    expected_rng, rng = random.Random(84), random.Random(84)
+    expected = ''.join(expected_rng.choices(['0', '1'], k=length))
+    assert LegacyBitSource(rng).string(length) == expected
+    assert rng.getstate() == expected_rng.getstate() # the generator is left in the same state
+
+
+def test_legacy_source_uses_the_global_random_module():
+    random.seed(84)
+    expected = ''.join(random.choices(['0', '1'], k=100))
+    random.seed(84)
+    assert LegacyBitSource().string(100) == expected
+
+
+@pytest.mark.parametrize("source", [GeneratorBitSource(), SystemBitSource(), LegacyBitSource(random.Random(1))])
+def test_sources_clear_the_padding(source):
+    bits = source.bits(13)
+    assert len(bits) == 13
+    assert bits.packed[-1] & 0b111 == 0
+
+
+def test_generator_source_is_reproducible():
+    a = GeneratorBitSource(np.random.default_rng(7)).bits(1000)
+    b = GeneratorBitSource(np.random.default_rng(7)).bits(1000)
+    assert a == b
+
+
+def test_bit_source_by_name():
+    assert isinstance(bit_source.bit_source("numpy", 1), GeneratorBitSource)
+    assert isinstance(bit_source.bit_source("system"), SystemBitSource)
+    assert isinstance(bit_source.bit_source("legacy", 1), LegacyBitSource)
+    with pytest.raises(ValueError):
+        bit_source.bit_source("quantum")
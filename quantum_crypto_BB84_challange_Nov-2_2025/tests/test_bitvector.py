@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+from bitvector import BitVector, pack_bits, unpack_bits, popcount
+
+LENGTHS = [0, 1, 7, 8, 9, 63, 64, 65, 1000]
+
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(84)
+
+
+@pytest.mark.parametrize("length", LENGTHS)
+def test_str_round_trip(rng, length):
+    bits = ''.join(rng.choice(['0', '1'], length))
+    vector = BitVector.from_str(bits)
+    assert len(vector) == length
+    assert vector.to_str() == bits
+    assert unpack_bits(pack_bits(bits), length) == bits
+    assert vector.popcount() == bits.count('1')
+
+
+def test_from_str_rejects_other_characters():
+    with pytest.raises(ValueError):
+        BitVector.from_str("01a1")
+
+
+@pytest.mark.parametrize("length", LENGTHS)
+def test_compress_matches_a_boolean_mask(rng, length):
+    bits, mask = rng.integers(0, 2, length), rng.integers(0, 2, length)
+    result = BitVector.from_bits(bits).compress(BitVector.from_bits(mask))
+    assert result.to_list() == bits[mask.astype(bool)].tolist()
+
+
+@pytest.mark.parametrize("length", LENGTHS[1:])
+def test_take_matches_indexing(rng, length):
+    bits = rng.integers(0, 2, length)
+    indices = rng.integers(0, length, 50)
+    assert BitVector.from_bits(bits).take(indices).to_list() == [int(bits[i]) for i in indices]
+
+
+@pytest.mark.parametrize("length", LENGTHS[1:])
+def test_delete_matches_a_list_comprehension(rng, length):
+    bits = rng.integers(0, 2, length)
+    indices = rng.integers(0, length, length // 3 + 1) # with duplicates
+    removed = set(indices.tolist())
+    expected = [int(bit) for i, bit in enumerate(bits) if i not in removed]
+    assert BitVector.from_bits(bits).delete(indices).to_list() == expected
+
+
+def test_operators_and_padding(rng):
+    a, b = rng.integers(0, 2, 13), rng.integers(0, 2, 13)
+    va, vb = BitVector.from_bits(a), BitVector.from_bits(b)
+    assert (va ^ vb).to_list() == (a ^ b).tolist()
+    assert (va & vb).to_list() == (a & b).tolist()
+    assert (va | vb).to_list() == (a | b).tolist()
+    inverted = ~va
+    assert inverted.to_list() == (1 - a).tolist()
+    assert popcount(inverted.packed) == 13 - int(a.sum()) # padding bits stay cleared
+    with pytest.raises(ValueError):
+        va ^ BitVector.zeros(12)
+
+
+def test_getitem(rng):
+    bits = rng.integers(0, 2, 20)
+    vector = BitVector.from_bits(bits)
+    assert [vector[i] for i in range(20)] == bits.tolist()
+    assert vector[-1] == bits[-1]
+    with pytest.raises(IndexError):
+        vector[20]
@@ -0,0 +1,112 @@
+import random
+import string
+
+import pytest
+
+import encryption_algorithms as enc
+
+
+def test_caesar_round_trip():
+    message = "Attack at dawn, Zebra! xyz"
+    for key in ["0", "1", "11001", "111111111"]:
+        encrypted = enc.encrypt_caesar_cipher(message, key)
+        assert enc.decrypt_caesar_cipher(encrypted, key) == message
+    assert enc.encrypt_caesar_cipher("abz ABZ", "11") == "dec DEC"
+
+
+def test_caesar_tables_are_cached_by_shift_mod_26():
+    enc._cached_caesar_table.cache_clear()
+    for shift in range(26):
+        key = format(shift, "b")
+        enc.decrypt_caesar_cipher(enc.encrypt_caesar_cipher("Hello", key), key)
+    assert enc.caesar_table(-3) is enc.caesar_table(23) is enc.caesar_table(49)
+    assert enc._cached_caesar_table.cache_info().currsize == 26
+    assert enc._cached_caesar_table.cache_info().misses == 26
+
+
+# the repeating-key XOR of the original challenge, character by character
+def baseline_encrypt_xor(message: str, key: str) -> str:
+    encrypted_bytes = bytearray()
+    for i, ch in enumerate(message):
+        encrypted_bytes.append(ord(ch) ^ ord(key[i % len(key)]))
+    return encrypted_bytes.hex()
+
+
+def baseline_decrypt_xor(encrypted_message: str, key: str) -> str:
+    return "".join(chr(byte ^ ord(key[i % len(key)])) for i, byte in enumerate(bytes.fromhex(encrypted_message)))
+
+
+def random_text(rng: random.Random, length: int, alphabet: str) -> str:
+    return "".join(rng.choice(alphabet) for _ in range(length))
+
+
+@pytest.mark.parametrize("alphabet", ["01", string.printable, "".join(map(chr, range(256)))])
+def test_xor_matches_the_baseline_loop(alphabet):
+    rng = random.Random(84)
+    for length in [0, 1, 7, 100, 1000]:
+        message = random_text(rng, length, string.printable + "éàü")
+        key = random_text(rng, rng.randint(1, 64), alphabet)
+        encrypted = enc.encrypt_xor_repeating_key(message, key)
+        assert encrypted == baseline_encrypt_xor(message, key)
+        assert enc.decrypt_xor_repeating_key(encrypted, key) == baseline_decrypt_xor(encrypted, key) == message
+
+
+def test_xor_large_buffers_match_the_baseline_loop():
+    rng = random.Random(1)
+    message = random_text(rng, enc.NUMPY_XOR_MIN_BYTES + 123, string.printable)
+    encrypted = enc.encrypt_xor_repeating_key(message, "0110100111")
+    assert encrypted == baseline_encrypt_xor(message, "0110100111")
+    assert enc.decrypt_xor_repeating_key(encrypted, "0110100111") == message
+
+
+def test_xor_edge_cases_match_the_baseline_loop():
+    assert enc.encrypt_xor_repeating_key("", "") == baseline_encrypt_xor("", "") == ""
+    assert enc.decrypt_xor_repeating_key("", "") == ""
+    assert enc.decrypt_xor_repeating_key("00", "ā") == baseline_decrypt_xor("00", "ā") == "ā"
+    assert enc.encrypt_xor_repeating_key("āb", "ā0") == baseline_encrypt_xor("āb", "ā0") # code points above 255
+    for function in (enc.encrypt_xor_repeating_key, baseline_encrypt_xor):
+        with pytest.raises(ValueError): # the XOR of the code points does not fit in a byte
+            function("ā", "0")
+
+
+def test_xor_repeating_key_bytes_offset():
+    data = bytes(range(200))
+    whole = enc.xor_repeating_key_bytes(data, b"key!7")
+    parts = b"".join(enc.xor_repeating_key_bytes(data[i:i + 33], b"key!7", offset=i) for i in range(0, 200, 33))
+    assert parts == whole
+
+
+# the Vigenère cipher of the original challenge, character by character
+def baseline_vigenere(message: str, key: str, sign: int) -> str:
+    result = []
+    key = key.lower()
+    key_index = 0
+    for ch in message:
+        if ch.isalpha():
+            shift = sign * (ord(key[key_index % len(key)]) - ord('a'))
+            if ch.isupper():
+                result.append(chr((ord(ch) - ord('A') + shift) % 26 + ord('A')))
+            else:
+                result.append(chr((ord(ch) - ord('a') + shift) % 26 + ord('a')))
+            key_index += 1
+        else:
+            result.append(ch)
+    return "".join(result)
+
+
+@pytest.mark.parametrize("alphabet", [string.printable, string.printable + "éÀüßΩ"]) # NumPy path, fallback loop
+def test_vigenere_matches_the_baseline_loop(alphabet):
+    rng = random.Random(84)
+    for length in [0, 1, 50, 2000]:
+        message = random_text(rng, length, alphabet)
+        key = random_text(rng, rng.randint(1, 20), string.ascii_letters + "0!é")
+        encrypted = enc.encrypt_vigenere_cipher(message, key)
+        assert encrypted == baseline_vigenere(message, key, +1)
+        assert enc.decrypt_vigenere_cipher(encrypted, key) == baseline_vigenere(encrypted, key, -1)
+
+
+def test_vigenere_empty_key():
+    assert enc.encrypt_vigenere_cipher("123", "") == "123"
+    assert enc.decrypt_vigenere_cipher("", "") == ""
+    with pytest.raises(ValueError):
+        enc.encrypt_vigenere_cipher("abc", "")
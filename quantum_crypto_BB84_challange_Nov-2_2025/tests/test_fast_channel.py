@@ -0,0 +1,43 @@
+import random
+
+import numpy as np
+import pytest
+
+import bb84_challenge as bb84
+import fast_channel
+
+QUBITS = 3000
+TOLERANCE = 0.06 # about 5 standard deviations of a rate over the ~1500 qubits of each basis relation
+
+
+def run_channel(backend: str, eve_present: bool) -> tuple[float, float]:
+    """Agreement rates (matching bases, mismatched bases) of one seeded session"""
+    random.seed(84)
+    bits, bases, eve_bases, bob_bases = (bb84.generate_random_binary_string(QUBITS) for _ in range(4))
+    if backend == "registers":
+        qubits = bb84.alice_prepare_qubits(bits, bases, register_size=100)
+    else:
+        qubits = bb84.alice_prepare_qubits(bits, bases, backend=backend)
+    if eve_present:
+        qubits, _ = bb84.eve_intercept_qubits(qubits, eve_bases, batch_size=QUBITS, shots="adaptive")
+    results = bb84.bob_measure_qubits(qubits, bob_bases, batch_size=QUBITS, shots="adaptive")
+    return fast_channel.agreement_rates(bits, bases, bob_bases, results)
+
+
+@pytest.fixture(autouse=True)
+def seeded_channel(monkeypatch):
+    monkeypatch.setattr(fast_channel, "rng", np.random.default_rng(7))
+
+
+@pytest.mark.parametrize("backend", ["numpy", "aer", "registers"])
+@pytest.mark.parametrize("eve_present, same_basis", [(False, 1.0), (True, 0.75)])
+def test_backends_have_the_bb84_agreement_rates(backend, eve_present, same_basis):
+    same_rate, diff_rate = run_channel(backend, eve_present)
+    assert same_rate == pytest.approx(same_basis, abs=TOLERANCE if eve_present else 0)
+    assert diff_rate == pytest.approx(0.5, abs=TOLERANCE)
+
+
+def test_the_numpy_backend_is_reproducible():
+    first = run_channel("numpy", True)
+    fast_channel.rng = np.random.default_rng(7)
+    assert run_channel("numpy", True) == first
@@ -0,0 +1,37 @@
+import os
+
+import pytest
+
+import encryption_algorithms as enc
+import file_encryption
+
+KEY = b"0110100111" # 10 bytes: none of the chunk sizes below is a multiple of it
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 7, 64, 1000, 4099, 1 << 20])
+def test_xor_file_matches_the_in_memory_xor(tmp_path, chunk_size):
+    data = os.urandom(20011)
+    src, encrypted, decrypted = tmp_path / "plain.bin", tmp_path / "plain.enc", tmp_path / "plain.dec"
+    src.write_bytes(data)
+    assert file_encryption.encrypt_file(src, encrypted, KEY, chunk_size) == len(data)
+    assert encrypted.read_bytes() == enc.xor_repeating_key_bytes(data, KEY) # key phase kept across the chunks
+    file_encryption.decrypt_file(encrypted, decrypted, KEY, chunk_size)
+    assert decrypted.read_bytes() == data
+
+
+def test_xor_file_empty_and_same_file(tmp_path):
+    src = tmp_path / "empty.bin"
+    src.write_bytes(b"")
+    assert file_encryption.xor_file(src, tmp_path / "out.bin", KEY) == 0
+    with pytest.raises(ValueError):
+        file_encryption.xor_file(src, src, KEY)
+
+
+def test_message_file_round_trip(tmp_path):
+    messages = ["Hello Bob!", "", "Attack at dawn, Zébra."]
+    encrypted, decrypted = tmp_path / "messages.txt", tmp_path / "plain.txt"
+    assert file_encryption.encrypt_messages_file(iter(messages), encrypted, "0110") == 3
+    assert list(file_encryption.iter_messages(encrypted)) == [
+        (f"Message {n}", enc.encrypt_xor_repeating_key(message, "0110")) for n, message in enumerate(messages, 1)]
+    assert [m for _, m in file_encryption.iter_decrypted_messages(encrypted, "0110")] == messages
+    assert file_encryption.decrypt_messages_file(encrypted, decrypted, "0110") == 3
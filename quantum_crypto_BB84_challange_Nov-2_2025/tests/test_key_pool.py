@@ -0,0 +1,80 @@
+import os
+import shutil
+
+import pytest
+
+from key_pool import KeyPool, Reservation
+
+
+@pytest.fixture
+def pools(tmp_path):
+    """Alice's and Bob's pools, holding the same 100 key bytes"""
+    alice_path, bob_path = tmp_path / "alice.pool", tmp_path / "bob.pool"
+    with KeyPool(alice_path) as alice:
+        alice.append(os.urandom(100))
+    shutil.copy(alice_path, bob_path)
+    shutil.copy(str(alice_path) + ".index", str(bob_path) + ".index")
+    alice, bob = KeyPool(alice_path), KeyPool(bob_path)
+    yield alice, bob
+    alice.close()
+    bob.close()
+
+
+def test_round_trip_and_no_reuse_across_parties(pools):
+    alice, bob = pools
+    reservation, ciphertext = alice.encrypt(b"hello")
+    assert bob.decrypt(reservation, ciphertext) == b"hello"
+    reply, reply_ciphertext = bob.encrypt(b"reply")
+    assert reply.offset >= reservation.offset + reservation.length # Alice's pad bytes are not reused by Bob
+    assert alice.decrypt(reply, reply_ciphertext) == b"reply"
+    assert alice.stats() == bob.stats()
+
+
+def test_a_slice_is_decrypted_once(pools):
+    alice, bob = pools
+    reservation, ciphertext = alice.encrypt(b"once")
+    bob.decrypt(reservation, ciphertext)
+    with pytest.raises(ValueError):
+        bob.decrypt(reservation, ciphertext)
+
+
+def test_out_of_order_messages(pools):
+    alice, bob = pools
+    first, second = alice.encrypt(b"first"), alice.encrypt(b"second")
+    assert bob.decrypt(*second) == b"second"
+    assert bob.encrypt(b"x")[0].offset >= second[0].offset + second[0].length # the gap is never reserved
+    assert bob.decrypt(*first) == b"first"
+    with pytest.raises(ValueError):
+        bob.decrypt(*first)
+
+
+def test_empty_message(pools):
+    alice, bob = pools
+    reservation, ciphertext = alice.encrypt(b"")
+    assert ciphertext == b"" and bob.decrypt(reservation, ciphertext) == b""
+    assert alice.available == 100
+
+
+def test_reserve_and_restart(tmp_path):
+    path = tmp_path / "key.pool"
+    with KeyPool(path) as pool:
+        pool.append(bytes(range(10)))
+        assert pool.reserve(4) == Reservation(0, 4)
+        with pytest.raises(ValueError):
+            pool.reserve(7)
+    with KeyPool(path) as pool:
+        assert pool.reserve(6) == Reservation(4, 6)
+        assert pool.read(Reservation(4, 6)) == bytes(range(4, 10))
+
+
+def test_read_only_returns_committed_bytes(tmp_path):
+    path = tmp_path / "key.pool"
+    with KeyPool(path) as pool, KeyPool(path) as other:
+        pool.append(bytes(range(10)))
+        with open(path, "ab") as f:
+            f.write(b"uncommitted") # an append interrupted before its index update
+        for reservation in (Reservation(8, 4), Reservation(10, 1), Reservation(-1, 2)):
+            with pytest.raises(ValueError):
+                pool.read(reservation)
+        other.append(b"more") # committed by another KeyPool: read() sees the new index size
+        assert pool.read(Reservation(8, 6)) == bytes([8, 9]) + b"more"
@@ -0,0 +1,63 @@
+import random
+
+import pytest
+
+import bb84_challenge as bb84
+import instrumentation
+from outcome_cache import OutcomeCache
+
+
+@pytest.fixture
+def cache():
+    yield bb84.enable_outcome_cache(seed=7)
+    bb84.disable_outcome_cache()
+
+
+def test_lru_eviction_and_counters():
+    cache = OutcomeCache(maxsize=2)
+    for key in "abc":
+        cache.put(key, {"0": 1})
+    assert "a" not in cache and len(cache) == 2
+    assert cache.sample("b", 10) == {"0": 10}
+    cache.put("d", {"1": 1}) # "c" is now the least recently used
+    assert list(cache._entries) == ["b", "d"]
+    assert cache.sample("c", 1) is None
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert cache.draw("d", 3) == {"1": 3} and cache.hits == 1
+
+
+def test_single_qubit_circuits_use_exact_distributions(cache):
+    random.seed(1)
+    bits, bases, bob_bases = (bb84.generate_random_binary_string(400) for _ in range(3))
+    jobs = instrumentation.simulator_stats["jobs"]
+    results = bb84.bob_measure_qubits(bb84.alice_prepare_qubits(bits, bases), bob_bases, batch_size=400)
+    assert instrumentation.simulator_stats["jobs"] == jobs # exact distributions: no simulator job at all
+    assert all(r == b for r, b, x, y in zip(results, bits, bases, bob_bases) if x == y)
+    assert cache.hits + cache.misses == 400 and cache.misses == len(cache)
+
+
+def test_wide_registers_are_not_cached(cache):
+    bits = "01" * 50
+    registers = bb84.alice_prepare_qubits(bits, "0" * 100, register_size=50)
+    assert bb84.bob_measure_qubits(registers, "0" * 100, shots="adaptive") == bits
+    assert len(cache) == 0 and cache.hits == 0
+
+
+def test_more_structures_than_entries():
+    cache = bb84.enable_outcome_cache(maxsize=2, seed=7)
+    try:
+        counts = bb84.run_circuits([bb84.measure_in_basis(qc, "0")
+                                    for qc in bb84.alice_prepare_qubits("0101", "0011")], shots=5)
+    finally:
+        bb84.disable_outcome_cache()
+    assert [c.most_frequent() for c in counts[:2]] == ["0", "1"] and len(cache) == 2
+
+
+def test_entries_are_keyed_by_channel_noise(cache):
+    from noisy_channel import ChannelNoise
+
+    qubits = bb84.alice_prepare_qubits("0" * 400, "0" * 400)
+    noisy = bb84.bob_measure_qubits(qubits, "0" * 400, batch_size=400, shots=1, noise=ChannelNoise(bit_flip=0.3))
+    assert 60 < noisy.count("1") < 180
+    assert bb84.bob_measure_qubits(qubits, "0" * 400, batch_size=400, shots=1) == "0" * 400
+    assert len(cache) == 2
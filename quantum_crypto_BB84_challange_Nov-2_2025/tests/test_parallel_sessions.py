@@ -0,0 +1,20 @@
+import parallel_sessions
+
+
+def test_sessions_do_not_depend_on_the_workers():
+    options = {"numqubits": 2000, "eve_present": True, "backend": "numpy", "threshold": 0.3}
+    serial = parallel_sessions.run_sessions(12, workers=1, **options)
+    pooled = parallel_sessions.run_sessions(12, workers=2, chunksize=5, **options)
+    assert serial.results == pooled.results
+    assert [r.session for r in pooled.results] == list(range(12))
+
+
+def test_cli_blocks_are_sessions():
+    import bb84_cli
+
+    options = {"eve_present": False, "backend": "numpy", "amplify": True}
+    key, _, blocks = bb84_cli.generate(3000, 1000, seed=5, **options)
+    summary = parallel_sessions.run_sessions(3, numqubits=1000, seed=5, workers=1, **options)
+    assert [(r.sifted_bits, r.revealed_errors) for r in summary.results] == \
+        [(block.sifted_bits, block.revealed_errors) for block in blocks]
+    assert len(key) == sum(r.secret_bits for r in summary.results) > 0
@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+from bitvector import BitVector
+from privacy_amplification import amplify, binary_entropy, final_key_length, toeplitz_hash
+
+
+def explicit_toeplitz(key: np.ndarray, output_length: int, seed: np.ndarray) -> np.ndarray:
+    """T x over GF(2) with the explicit matrix T[i, j] = t[i - j + n - 1]"""
+    n = key.size
+    matrix = np.array([[seed[i - j + n - 1] for j in range(n)] for i in range(output_length)], dtype=np.int64)
+    return (matrix @ key) & 1 if output_length else np.zeros(0, dtype=np.int64)
+
+
+@pytest.mark.parametrize("n, m", [(1, 1), (8, 3), (64, 64), (100, 37), (257, 200)])
+def test_toeplitz_hash_matches_the_explicit_matrix(n, m):
+    rng = np.random.default_rng(n * 1000 + m)
+    key, seed = rng.integers(0, 2, n), rng.integers(0, 2, m + n - 1)
+    result = toeplitz_hash(BitVector.from_bits(key), m, BitVector.from_bits(seed))
+    assert result.to_list() == explicit_toeplitz(key, m, seed).tolist()
+
+
+def test_toeplitz_hash_checks_its_arguments():
+    with pytest.raises(ValueError):
+        toeplitz_hash(BitVector.zeros(8), 9, BitVector.zeros(16))
+    with pytest.raises(ValueError):
+        toeplitz_hash(BitVector.zeros(8), 4, BitVector.zeros(10))
+
+
+def test_final_key_length():
+    assert binary_entropy(0.0) == 0.0 and binary_entropy(0.5) == pytest.approx(1.0)
+    assert final_key_length(1000, 0.0, 0, 20) == 960
+    assert final_key_length(1000, 0.05, 100, 20) == int(np.floor(1000 - 1000 * binary_entropy(0.05) - 140))
+    assert final_key_length(10, 0.0, 0, 20) == 0
+
+
+def test_amplify_is_deterministic_for_a_seed():
+    key = BitVector.from_bits(np.random.default_rng(1).integers(0, 2, 2000))
+    a, b = amplify(key, 0.01, 150, seed=5), amplify(key, 0.01, 150, seed=5)
+    assert a == b and len(a) == final_key_length(2000, 0.01, 150)
+
+
+@pytest.mark.parametrize("length", [0, 1, 30])
+def test_amplify_without_extractable_bits_returns_an_empty_key(length):
+    assert len(amplify(BitVector.zeros(length), 0.0, 0, seed=0)) == 0
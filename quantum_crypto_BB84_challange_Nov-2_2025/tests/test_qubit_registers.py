@@ -0,0 +1,27 @@
+import pytest
+
+import bb84_challenge as bb84
+import qubit_registers
+
+
+def test_marginal_bits_majority_per_qubit():
+    # qubit 0 is the rightmost character: it is 1 in 7 of the 10 shots, qubit 1 in 6 and qubit 2 in none
+    assert qubit_registers.marginal_bits({"001": 4, "011": 3, "010": 3}, 3) == "110"
+    assert qubit_registers.marginal_bits({"01": 1, "10": 2}, 2) == "01"
+
+
+def test_registers_are_measured_once():
+    bits, bases = "0110" * 30, "0011" * 30
+    registers = bb84.alice_prepare_qubits(bits, bases, register_size=50)
+    assert bb84.bob_measure_qubits(registers, bases, batch_size=3, shots=1) == bits
+    with pytest.raises(ValueError):
+        bb84.bob_measure_qubits(registers, bases, shots=1)
+    assert [qc.count_ops()["measure"] for qc in registers.circuits] == [50, 50, 20] # not measured a second time
+
+
+def test_eve_resends_fresh_registers():
+    bits = "01" * 60
+    registers = bb84.alice_prepare_qubits(bits, "0" * 120, register_size=40)
+    resent, measured = bb84.eve_intercept_qubits(registers, "0" * 120, batch_size=3, shots=1)
+    assert measured == bits and registers.measured and not resent.measured
+    assert bb84.bob_measure_qubits(resent, "0" * 120, batch_size=3, shots=1) == bits
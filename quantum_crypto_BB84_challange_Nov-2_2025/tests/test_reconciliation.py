@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+from bitvector import BitVector
+from reconciliation import cascade
+
+
+def noisy_copy(key: np.ndarray, qber: float, rng: np.random.Generator) -> np.ndarray:
+    return key ^ (rng.random(key.size) < qber).astype(np.uint8)
+
+
+@pytest.mark.parametrize("length, qber", [(1000, 0.01), (10000, 0.03), (50000, 0.05)])
+def test_cascade_corrects_bob_key(length, qber):
+    rng = np.random.default_rng(84)
+    alice = rng.integers(0, 2, length, dtype=np.uint8)
+    bob = noisy_copy(alice, qber, rng)
+    result = cascade(BitVector.from_bits(alice), BitVector.from_bits(bob), qber)
+    assert result.keys_match
+    assert result.key == BitVector.from_bits(alice)
+    assert result.corrected_bits == int((alice != bob).sum())
+    assert 0 < result.leaked_bits < length
+
+
+def test_cascade_identical_and_empty_keys():
+    key = BitVector.from_str("0110" * 50)
+    result = cascade(key, key, 0.01)
+    assert result.keys_match and result.key == key and result.corrected_bits == 0
+    empty = cascade(BitVector.zeros(0), BitVector.zeros(0), 0.01)
+    assert empty.keys_match and len(empty.key) == 0 and empty.leaked_bits == 0
+
+
+def test_cascade_rejects_different_lengths():
+    with pytest.raises(ValueError):
+        cascade(BitVector.zeros(8), BitVector.zeros(9), 0.01)
@@ -0,0 +1,228 @@
+"""
+Key recovery for repeating-key XOR ciphertexts (audit of short repeating BB84 keys)
+
+main() of bb84_challenge encrypts every message with encrypt_xor_repeating_key: the key, a few dozen '0'/'1'
+characters, is repeated along each message and restarts at every message. All the messages of a file are
+therefore XORed with the same periodic pad, and analysing them together breaks the key without any qubit:
+
+1. key length: for every candidate length L, the normalized Hamming distance between consecutive L-byte blocks
+   of the same message (averaged over all messages) is lowest when L is a multiple of the key length, because
+   the key cancels out and only plaintext XOR plaintext (English, few differing bits) remains. This ranks keys
+   of arbitrary bytes well, but a BB84 key only holds '0' (0x30) and '1' (0x31): its bytes differ in one bit and
+   the distances barely move, so every length is also decrypted and scored (step 2) and the best penalized
+   score decides
+2. key bytes: the bytes of all messages at the positions i = j mod L were all XORed with key[j]; the candidate
+   key byte making them look most like English text (log-frequency score) wins
+3. known plaintext: if the messages start with a known header, its key bytes are read off directly (majority
+   vote over the messages) and replace the statistical guess for those positions
+
+The ciphertexts are held in a single zero-padded NumPy matrix (messages x bytes) with a validity mask, so each
+step is a handful of array operations whatever the number of messages (column histograms with np.bincount,
+one matrix product to score all 256 candidate bytes of every column).
+
+    python xor_analysis.py encrypted_messages_part1.txt encrypted_messages_part2.txt
+    python xor_analysis.py encrypted_messages_part1.txt --alphabet 01 --known-prefix '"'
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+from dataclasses import dataclass
+
+import numpy as np
+
+import encryption_algorithms as enc
+from bitvector import popcount
+from file_encryption import iter_messages
+
+MAX_KEY_LENGTH = 128
+
+# relative frequency of the characters in English text (space, letters, common punctuation)
+_ENGLISH = {' ': 18.0, 'e': 10.2, 't': 7.5, 'a': 6.5, 'o': 6.2, 'i': 5.7, 'n': 5.7, 's': 5.3, 'h': 5.0,
+            'r': 4.9, 'd': 3.4, 'l': 3.3, 'u': 2.3, 'c': 2.2, 'm': 2.0, 'w': 1.7, 'f': 1.8, 'g': 1.6, 'y': 1.4,
+            'p': 1.5, 'b': 1.2, 'v': 0.8, 'k': 0.6, 'j': 0.1, 'x': 0.2, 'q': 0.1, 'z': 0.1,
+            ',': 1.0, '.': 1.0, "'": 0.3, '"': 0.3, '-': 0.2, '?': 0.1, '!': 0.1, ':': 0.1, ';': 0.1}
+
+
+def _english_weights() -> np.ndarray:
+    """Log-frequency score of every byte value as a plaintext character"""
+    frequency = np.full(256, 1e-4)
+    frequency[0x20:0x7f] = 0.02 # other printable characters: rare but possible
+    for char, value in _ENGLISH.items():
+        frequency[ord(char)] = value
+        if char.isalpha():
+            frequency[ord(char.upper())] = value * 0.1
+    frequency[ord('\n')] = 0.1
+    return np.log(frequency / frequency.sum())
+
+
+ENGLISH_WEIGHTS = _english_weights()
+
+
+@dataclass
+class KeyRecovery:
+    """
+    Result of recover_key
+    @param key_length: recovered key length
+    @param key: recovered key bytes
+    @param score: mean English log-frequency of the decrypted bytes (higher is better)
+    @param length_scores: {candidate length: normalized Hamming distance} (lower is better)
+    """
+    key_length: int
+    key: bytes
+    score: float
+    length_scores: dict[int, float]
+
+    @property
+    def key_text(self) -> str:
+        return self.key.decode('latin-1')
+
+
+# Loading:-------------------------------------------------
+def ciphertext_matrix(ciphertexts: list[bytes]) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Stack the ciphertexts in one zero-padded matrix
+    @param ciphertexts: list of bytes
+    @return: tuple (uint8 matrix messages x longest length, bool mask of the real bytes)
+    """
+    lengths = np.array([len(c) for c in ciphertexts], dtype=np.int64)
+    width = int(lengths.max()) if lengths.size else 0
+    mask = np.arange(width) < lengths[:, None]
+    matrix = np.zeros(mask.shape, dtype=np.uint8)
+    matrix[mask] = np.frombuffer(b"".join(ciphertexts), dtype=np.uint8)
+    return matrix, mask
+
+
+# Analysis:------------------------------------------------
+def hamming_scores(matrix: np.ndarray, mask: np.ndarray, lengths: range) -> dict[int, float]:
+    """
+    Normalized Hamming distance between consecutive blocks of every candidate key length
+    @param matrix: ciphertext matrix (see ciphertext_matrix)
+    @param mask: validity mask
+    @param lengths: candidate key lengths
+    @return: {length: differing bits per compared byte} (lengths without two full blocks in any message are left out)
+    """
+    scores = {}
+    for length in lengths:
+        blocks = matrix.shape[1] // length
+        if blocks < 2:
+            continue
+        x = matrix[:, :blocks * length].reshape(len(matrix), blocks, length)
+        valid = mask[:, :blocks * length].reshape(len(matrix), blocks, length)
+        pairs = valid[:, 1:] & valid[:, :-1]
+        compared = int(pairs.sum())
+        if compared:
+            scores[length] = popcount((x[:, 1:] ^ x[:, :-1])[pairs]) / compared
+    return scores
+
+
+def column_histograms(matrix: np.ndarray, mask: np.ndarray, length: int) -> np.ndarray:
+    """
+    Histogram of the ciphertext bytes of every key position
+    @return: int64 array (length x 256), row j counts the bytes at positions i = j mod length
+    """
+    columns = np.broadcast_to(np.arange(matrix.shape[1]) % length, matrix.shape)[mask]
+    return np.bincount(columns * 256 + matrix[mask], minlength=length * 256).reshape(length, 256)
+
+
+def best_key_bytes(histograms: np.ndarray, alphabet: bytes | None = None) -> tuple[np.ndarray, float]:
+    """
+    Most English-looking key byte of every column
+    @param histograms: output of column_histograms
+    @param alphabet: allowed key bytes (e.g. b"01" for a BB84 key string); None: all 256 values
+    @return: tuple (key bytes, mean log-frequency of the decrypted bytes)
+    """
+    candidates = np.arange(256, dtype=np.uint8) if alphabet is None else np.frombuffer(alphabet, dtype=np.uint8)
+    # score[j, k] = sum over the ciphertext bytes c of column j of weight(c ^ candidate k)
+    table = ENGLISH_WEIGHTS[np.arange(256)[:, None] ^ candidates[None, :]] # (ciphertext byte, candidate)
+    scores = histograms @ table
+    best = scores.argmax(axis=1)
+    total = histograms.sum()
+    return candidates[best], float(scores[np.arange(len(best)), best].sum() / total) if total else 0.0
+
+
+def known_plaintext_key(matrix: np.ndarray, mask: np.ndarray, prefix: bytes) -> np.ndarray:
+    """
+    Key bytes at the positions of a plaintext prefix shared by the messages (majority vote over the messages)
+    @param prefix: plaintext every message is expected to start with
+    @return: uint8 array of len(prefix) key bytes (positions no message covers are 0)
+    """
+    width = min(len(prefix), matrix.shape[1])
+    known = np.frombuffer(prefix[:width], dtype=np.uint8)
+    votes = np.zeros((width, 256), dtype=np.int64)
+    columns = np.broadcast_to(np.arange(width), (len(matrix), width))[mask[:, :width]]
+    np.add.at(votes, (columns, (matrix[:, :width] ^ known)[mask[:, :width]]), 1)
+    return votes.argmax(axis=1).astype(np.uint8)
+
+
+def recover_key(ciphertexts: list[bytes], max_length: int = MAX_KEY_LENGTH, alphabet: bytes | None = None,
+                known_prefix: bytes | None = None, candidates: int | None = None) -> KeyRecovery:
+    """
+    Find the key length and the key of ciphertexts all encrypted with the same repeating key.
+    Every length is decrypted (best_key_bytes) and the lengths are compared on the English score minus the cost of
+    the key: L log(len(alphabet)) nats over the whole text. Longer keys always fit the text a little better, the
+    penalty keeps the true length (and not one of its multiples, which decrypt just as well).
+    @param ciphertexts: list of ciphertext bytes
+    @param max_length: longest key length tried (at most half the longest message)
+    @param alphabet: allowed key bytes (b"01" for keys from bb84_challenge); None: any byte
+    @param known_prefix: plaintext the messages start with, if known
+    @param candidates: None: try every length; n: only the n lengths with the lowest Hamming distance (fast
+                       pre-selection for keys of arbitrary bytes, but blind to '0'/'1' keys whose bytes differ
+                       in a single bit)
+    @return: KeyRecovery
+    """
+    matrix, mask = ciphertext_matrix(ciphertexts)
+    length_scores = hamming_scores(matrix, mask, range(1, max_length + 1))
+    if not length_scores:
+        raise ValueError("the messages are too short to estimate the key length")
+    lengths = sorted(length_scores, key=length_scores.get)[:candidates] if candidates else sorted(length_scores)
+    key_cost = np.log(256 if alphabet is None else len(alphabet)) / mask.sum()
+
+    best, best_rank = None, -np.inf
+    for length in lengths:
+        key, score = best_key_bytes(column_histograms(matrix, mask, length), alphabet)
+        if score - length * key_cost > best_rank:
+            best, best_rank = KeyRecovery(length, key.tobytes(), score, length_scores), score - length * key_cost
+    if known_prefix:
+        key = np.frombuffer(best.key, dtype=np.uint8).copy()
+        known = known_plaintext_key(matrix, mask, known_prefix)[:best.key_length]
+        key[:len(known)] = known
+        best.key = key.tobytes()
+    return best
+
+
+def decrypt_all(messages: list[tuple[str, str]], key: bytes) -> list[tuple[str, str]]:
+    """
+    Decrypt every message with decrypt_xor_repeating_key
+    @param messages: list of (message id, hex ciphertext)
+    @param key: recovered key
+    @return: list of (message id, plaintext)
+    """
+    return [(msg_id, enc.decrypt_xor_repeating_key(encrypted, key.decode('latin-1'))) for msg_id, encrypted in messages]
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Recover the repeating XOR key of encrypted message files")
+    parser.add_argument("files", nargs="+", help="files of 'id: hex' lines")
+    parser.add_argument("--combined", action="store_true", help="all the files share one key (default: one per file)")
+    parser.add_argument("--max-length", type=int, default=MAX_KEY_LENGTH, help="longest key length tried")
+    parser.add_argument("--alphabet", help="allowed key characters, e.g. 01 for BB84 keys (default: any byte)")
+    parser.add_argument("--known-prefix", help="plaintext every message starts with")
+    args = parser.parse_args(argv)
+
+    groups = [args.files] if args.combined else [[filename] for filename in args.files]
+    for filenames in groups:
+        messages = [message for filename in filenames for message in iter_messages(filename)]
+        recovery = recover_key([bytes.fromhex(encrypted) for _, encrypted in messages], args.max_length,
+                               args.alphabet.encode('latin-1') if args.alphabet else None,
+                               args.known_prefix.encode('latin-1') if args.known_prefix else None)
+        print(f"{', '.join(filenames)}: key length {recovery.key_length}, score {recovery.score:.3f}")
+        print(f"key: {recovery.key_text!r}")
+        for msg_id, plaintext in decrypt_all(messages, recovery.key):
+            print(f"  {msg_id}: {plaintext}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())